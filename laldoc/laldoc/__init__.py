@@ -9,15 +9,8 @@ from docutils.parsers.rst import Directive
 from docutils.statemachine import ViewList
 import libadalang as lal
 from sphinx import addnodes as N
+from sphinx.util import logging
 from sphinx.util.nodes import nested_parse_with_titles
-import sys
-
-
-PY3 = sys.version_info[0] == 3
-if PY3:
-    from functools import lru_cache as memoize
-else:
-    from funcy import memoize
 
 
 try:
@@ -27,6 +20,9 @@ except ImportError:
     pass
 
 
+logger = logging.getLogger(__name__)
+
+
 class AutoPackage(Directive):
     """
     Sphinx directive to generate the documentation of an Ada package from the
@@ -93,7 +89,6 @@ class AutoPackage(Directive):
     def warn(self, message, *args, **kwargs):
         self.state.document.reporter.warning(message.format(*args, **kwargs))
 
-    @memoize
     def get_documentation(self, decl):
         # type: (lal.BasicDecl) -> Tuple[List[str], Dict[str, str]]
         """
@@ -103,16 +98,27 @@ class AutoPackage(Directive):
 
         1. the list of lines that constitutes the documentation for ``decl``;
         2. a mapping (key: string, value: string) for the parsed annotations.
+
+        Results are cached for the package being documented.
         """
+        try:
+            result = self.documentation[decl]
+            self.documentation_hits += 1
+            return result
+        except KeyError:
+            pass
+
         try:
             doc = decl.p_doc.splitlines()
             annots = {a.key: self.decode_annotation(a.key, a.value)
                       for a in decl.p_doc_annotations}
+            result = (doc, annots)
         except lal.PropertyError:
             self.warn('Badly formatted doc for {}'.format(decl.entity_repr))
-            return [], {}
+            result = ([], {})
 
-        return doc, annots
+        self.documentation[decl] = result
+        return result
 
     def run(self):
         file_name = self.arguments[0].strip()
@@ -349,8 +355,16 @@ class AutoPackage(Directive):
             print('Not a package')
             return
 
+        self.documentation = {}
+        self.documentation_hits = 0
+
         content = []
         self.handle_package(package_decl, content)
+
+        logger.verbose(
+            '%s: documentation cache: %d hits, %d misses', file_name,
+            self.documentation_hits, len(self.documentation)
+        )
         return content
 
     def handle_package(self, package_decl, content):
@@ -21,36 +21,106 @@ The workflow for the moment is hence to:
 """
 
 
-from collections import defaultdict
-from contextlib import contextmanager
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+import cProfile
+import fnmatch
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
 import os
 from os import path as P
 import re
+import subprocess
 import sys
-from typing import Dict, List, Optional as Opt, Set, Tuple, Union
+import time
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Optional as Opt, Set,
+    Tuple, TypeVar, Union
+)
 
 import libadalang as lal
 
+from laldoc import index
+from laldoc import model as M
+from laldoc import render_rst
+from laldoc import timing
+from laldoc.index import is_documentable_subp
 
-PY3 = sys.version_info[0] == 3
-if PY3:
-    from functools import lru_cache as memoize
-else:
-    from funcy import memoize
 
+_start_time = time.perf_counter()
+"""
+Time at which the program started, before loading and parsing units.
+"""
+
+T = TypeVar("T")
+
+SYMBOL_MANIFEST = "ada-symbols.json"
+"""
+Name of the file listing the fully qualified names documented in the output
+directory, which the Ada domain can load through its ``ada_symbol_manifests``
+option.
+"""
+
+BUILD_MANIFEST = "laldoc-manifest.json"
+"""
+Name of the file recording, in the output directory, the inputs from which each
+rst file was generated, so that later runs only process the units whose inputs
+changed.
+"""
+
+PROFILE_SUMMARY = "laldoc-profile.json"
+"""
+Name of the file where ``--profile`` writes the times of the processing
+phases, in the output directory.
+"""
 
-UNDERLINES = ["-", "^", "\""]
 
+class Diagnostic(NamedTuple):
+    """
+    Error or warning reported while processing a unit.
+    """
 
-def is_documentable_subp(node: lal.BasicDecl):
+    severity: str
     """
-    Return whether ``node`` is part of the class of subprogram declarations we
-    want to document.
+    ``"error"`` or ``"warning"``.
     """
-    return node.is_a(
-        lal.BasicSubpDecl, lal.ExprFunction,
-        lal.SubpRenamingDecl, lal.NullSubpDecl
-    )
+
+    message: str
+
+
+def generator_version() -> str:
+    """
+    Return a string identifying this version of laldoc and of Libadalang. Rst
+    files generated by another version are always generated again.
+    """
+    code_hash = hashlib.sha1()
+    for module in (
+        __file__, M.__file__, render_rst.__file__, index.__file__
+    ):
+        with open(module, "rb") as f:
+            code_hash.update(f.read())
+    return f"{getattr(lal, 'version', '')}:{code_hash.hexdigest()}"
+
+
+def write_if_changed(filename: str, content: str) -> bool:
+    """
+    Write ``content`` to ``filename``, unless it already contains exactly
+    that, so that its modification time only changes with its content. Return
+    whether the file was written.
+    """
+    try:
+        with open(filename) as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    with open(filename, "w") as f:
+        f.write(content)
+    return True
 
 
 def strip_ws(strn: str) -> str:
@@ -60,6 +130,27 @@ def strip_ws(strn: str) -> str:
     return re.sub(r"\s+", " ", strn)
 
 
+def written_type_name(type_expr: Opt[lal.TypeExpr]) -> Opt[str]:
+    """
+    Return the name of the type that ``type_expr`` designates as written in
+    the source, lower cased, or None if it does not designate a type by its
+    name. Access types and class-wide types designate their designated and
+    specific types.
+    """
+    if isinstance(type_expr, lal.AnonymousType):
+        type_def = type_expr.f_type_decl.f_type_def
+        if not isinstance(type_def, lal.TypeAccessDef):
+            return None
+        type_expr = type_def.f_subtype_indication
+    if not isinstance(type_expr, lal.SubtypeIndication):
+        return None
+
+    name = type_expr.f_name
+    if isinstance(name, lal.AttributeRef):
+        name = name.f_prefix
+    return strip_ws(name.text).lower()
+
+
 class GenerateDoc(lal.App):
     """
     Main class for the documentation generator app, using the lal.App
@@ -76,22 +167,75 @@ class GenerateDoc(lal.App):
                                  # decl or not. Default is True
     }
 
-    lines: List[str]
-    _indent: int
-    _package_nesting_level: int
+    symbols: Dict[str, Tuple[str, str]]
+    """
+    Entities documented in the unit being processed: fully qualified name ->
+    (name of the rst file without extension, kind of the Ada domain object).
+    """
 
-    def add_string(self, strn: str):
-        """
-        Add ``strn`` to the rst output.
-        """
-        self.add_lines(strn.splitlines())
+    unit_symbols: Dict[str, Dict[str, Tuple[str, str]]]
+    """
+    Entities documented for each unit, by unit filename.
+    """
 
-    def add_lines(self, lines: List[str]):
-        """
-        Add given lines to the rst output.
-        """
-        for line in lines:
-            self.lines.append(f"{' ' * self._indent}{line}")
+    diagnostics: List[Diagnostic]
+    """
+    Diagnostics reported for the unit being processed.
+    """
+
+    unit_diagnostics: Dict[str, List[Diagnostic]]
+    """
+    Diagnostics reported for each unit, by unit filename.
+    """
+
+    build_manifest: Dict[str, dict]
+    """
+    Inputs and outputs of each processed unit, by unit filename, as saved in
+    the ``BUILD_MANIFEST`` file.
+    """
+
+    _file_hashes: Dict[str, Opt[str]]
+
+    _documentation: Dict[
+        lal.BasicDecl, Tuple[List[str], Dict[str, Union[bool, str, None]]]
+    ]
+    """
+    Cache for :meth:`get_documentation`, cleared for each unit.
+    """
+
+    _queries: Dict[Tuple[str, lal.AdaNode], Any]
+    """
+    Cache for :meth:`query`: (property name, node) -> property value.
+    """
+
+    stats: Counter
+    """
+    Statistics about the processing of units, printed in verbose mode.
+    """
+
+    profile: timing.UnitProfile
+    """
+    Times of the processing phases of the unit being processed.
+    """
+
+    declarations: index.DeclarationIndex
+    """
+    Declarations of all units, built before documenting them.
+    """
+
+    profile_summary: timing.ProfileSummary
+
+    shard_files: Dict[str, Set[str]]
+    """
+    Rst files of the shards that may exist in the output directory, by rst
+    file of their unit, all without extension: the ones found there when
+    sharding is enabled, and the ones recorded by the previous run. Shards
+    that units do not produce anymore are removed.
+    """
+
+    written_files: int
+    unchanged_files: int
+    skipped_units: int
 
     def add_arguments(self):
         self.parser.add_argument(
@@ -99,33 +243,113 @@ class GenerateDoc(lal.App):
             default=".",
             help='Output directory for the generated rst files'
         )
+        self.parser.add_argument(
+            '-j', '--jobs', type=int, default=1,
+            help='Number of processes to use to process units, 0 meaning one'
+                 ' per CPU. The output does not depend on it.'
+        )
+        self.parser.add_argument(
+            '--force', action='store_true',
+            help='Process all selected units, including the ones whose'
+                 ' source and dependencies did not change since the last run'
+        )
+        self.parser.add_argument(
+            '-u', '--unit', action='append', dest='unit_patterns',
+            metavar='PATTERN',
+            help='Only process the units whose name or source file matches'
+                 ' this glob pattern (case insensitive). Can be repeated. The'
+                 ' files generated for the other units are kept as they are'
+        )
+        self.parser.add_argument(
+            '-k', '--keep-going', action='store_true',
+            help='Go on processing the other units after errors in a unit,'
+                 ' and print all the diagnostics at the end. The exit status'
+                 ' is still non-zero if there were errors.'
+        )
+        self.parser.add_argument(
+            '--report', type=str,
+            help='Write the diagnostics of all units to this JSON file'
+        )
+        self.parser.add_argument(
+            '--watch', type=float, nargs='?', const=0.5, metavar='SECONDS',
+            help='After processing units, keep running and process again the'
+                 ' units whose sources or dependencies change, checking every'
+                 ' SECONDS (0.5 by default), until interrupted. Implies'
+                 ' --keep-going'
+        )
+        self.parser.add_argument(
+            '--watch-command', type=str, metavar='COMMAND',
+            help='Shell command to run in watch mode after rst files were'
+                 ' written, for instance to build the documentation with'
+                 ' Sphinx'
+        )
+        self.parser.add_argument(
+            '--model', action='store_true',
+            help='Also save the documentation model of each unit as a JSON'
+                 ' file next to its rst file, from which laldoc.render_rst'
+                 ' can render it again without analysis'
+        )
+        self.parser.add_argument(
+            '--model-directive', action='store_true',
+            help='Save the documentation model of each unit as with --model,'
+                 ' and only write in its rst file an ada:package_model'
+                 ' directive, which builds the documentation from the model'
+        )
+        self.parser.add_argument(
+            '--shard-size', type=int, default=0, metavar='N',
+            help='Split the documentation of units declaring more than N'
+                 ' entities in one rst file per nested package and per N'
+                 ' other entities, listed in a toctree of the rst file of the'
+                 ' unit, so that Sphinx can read them in parallel and'
+                 ' separately. 0 means never. Not compatible with'
+                 ' --model-directive'
+        )
+        self.parser.add_argument(
+            '--no-resolve', action='store_false', dest='resolve',
+            help='Document units from their syntax only, without name'
+                 ' resolution, which is much faster. Type names are output'
+                 ' as written in the source rather than fully qualified,'
+                 ' subprograms are documented with the first type declared'
+                 ' before them in the package that their profile names, and'
+                 ' only the discriminants and components written in the'
+                 ' declaration of a record type are documented, not the'
+                 ' inherited ones'
+        )
+        self.parser.add_argument(
+            '--component-budget', type=int, default=0, metavar='N',
+            help='Document at most N discriminants and components per record'
+                 ' type, 0 meaning no limit'
+        )
+        self.parser.add_argument(
+            '--profile', action='store_true',
+            help='Print the time spent in each processing phase and the'
+                 ' slowest units and entities, and save them in the output'
+                 f' directory as {PROFILE_SUMMARY}'
+        )
+        self.parser.add_argument(
+            '--cprofile', type=str, metavar='FILE',
+            help='Save cProfile statistics about the processing of units in'
+                 ' FILE. Units are then processed in this process only.'
+        )
+        self.parser.add_argument(
+            '--verbose', action='store_true',
+            help='Print statistics about the processing of units'
+        )
         super(GenerateDoc, self).add_arguments()
 
-    @contextmanager
-    def indent(self):
-        """
-        Context manager to indent sphinx code emitted inside the with block.
-        """
-        try:
-            self._indent += 4
-            yield
-        finally:
-            self._indent -= 4
-
-    @staticmethod
-    def error(error_message: str):
+    def error(self, error_message: str) -> None:
         """
-        Print an error message and exit.
+        Print an error message and record it for the unit being processed.
         """
         print(error_message)
-        exit(1)
+        self.diagnostics.append(Diagnostic("error", error_message))
 
-    @staticmethod
-    def warn(error_message: str):
+    def warn(self, error_message: str) -> None:
         """
-        Print a warning message.
+        Print a warning message and record it for the unit being processed.
         """
         print(error_message)
+        self.diagnostics.append(Diagnostic("warning", error_message))
 
     def process_annotation(
         self, key: str, value: str
@@ -167,10 +391,9 @@ class GenerateDoc(lal.App):
             )
         return "".join(split_doc)
 
-    @memoize
     def get_documentation(
         self, decl: lal.BasicDecl
-    ) -> Tuple[List[str], Dict[str, str]]:
+    ) -> Tuple[List[str], Dict[str, Union[bool, str, None]]]:
         """
         Return the documentation for given basic declaration.
 
@@ -178,27 +401,628 @@ class GenerateDoc(lal.App):
 
         1. the list of lines that constitutes the documentation for ``decl``;
         2. a mapping (key: string, value: string) for the parsed annotations.
+
+        Results are cached until the next unit is processed, as declarations
+        are looked up several times while documenting a package.
         """
+        try:
+            result = self._documentation[decl]
+            self.stats["documentation cache hits"] += 1
+            return result
+        except KeyError:
+            self.stats["documentation cache misses"] += 1
+
         try:
             doc = self.process_docstring(decl.p_doc).splitlines()
             annots = {a.key: self.process_annotation(a.key, a.value)
                       for a in decl.p_doc_annotations}
+            result = (doc, annots)
         except lal.PropertyError:
             self.warn('Badly formatted doc for {}'.format(decl.entity_repr))
-            return [], {}
+            result = ([], {})
 
-        return doc, annots
+        self._documentation[decl] = result
+        return result
+
+    def query(
+        self, prop: str, node: lal.AdaNode, compute: Callable[[], T]
+    ) -> T:
+        """
+        Return the value of the libadalang property ``prop`` for ``node``, as
+        computed by ``compute``.
+
+        The same declarations are queried again and again while documenting a
+        project (for instance the type of all the parameters of a given type),
+        so values are cached for the whole run.
+        """
+        self.stats[f"{prop} lookups"] += 1
+        key = (prop, node)
+        try:
+            return self._queries[key]
+        except KeyError:
+            pass
+
+        self.stats[f"{prop} calls"] += 1
+        result = compute()
+        self._queries[key] = result
+        return result
+
+    def fully_qualified_name(self, decl: lal.BasicDecl) -> str:
+        """
+        Return the fully qualified name of ``decl``.
+        """
+        return self.query(
+            "p_fully_qualified_name", decl,
+            lambda: decl.p_fully_qualified_name
+        )
+
+    def designated_type_decl(
+        self, type_expr: lal.TypeExpr
+    ) -> lal.BaseTypeDecl:
+        """
+        Return the type declaration designated by ``type_expr``.
+        """
+        return self.query(
+            "p_designated_type_decl", type_expr,
+            lambda: type_expr.p_designated_type_decl
+        )
+
+    def formal_type(self, decl: lal.BaseFormalParamDecl) -> lal.BaseTypeDecl:
+        """
+        Return the type of the formal ``decl``.
+        """
+        return self.query("p_formal_type", decl, lambda: decl.p_formal_type())
+
+    def record_components(
+        self, decl: lal.BaseTypeDecl
+    ) -> List[lal.BaseFormalParamDecl]:
+        """
+        Return the discriminants and components of the record type ``decl``,
+        including inherited ones, in declaration order, and stop after
+        ``--component-budget`` of them. In ``--no-resolve`` mode, only the
+        ones written in the declaration of ``decl`` are returned.
+
+        Components of all variants are found by walking the component lists
+        of the type and of its ancestors, which takes time linear in the size
+        of their declarations, unlike enumerating the shapes of the type,
+        whose number grows exponentially with nested variant parts.
+        """
+        def type_components(
+            typ: lal.BaseTypeDecl
+        ) -> Iterator[lal.ComponentDecl]:
+            if self.args.resolve:
+                typ = typ.p_base_subtype().p_full_view
+            if not isinstance(typ, lal.TypeDecl):
+                return
+
+            type_def = typ.f_type_def
+            if isinstance(type_def, lal.DerivedTypeDef):
+                if self.args.resolve:
+                    yield from parent_components(typ, type_def)
+                record_def = type_def.f_record_extension
+            elif isinstance(type_def, lal.RecordTypeDef):
+                record_def = type_def.f_record_def
+            else:
+                return
+
+            if record_def is not None:
+                yield from list_components(record_def.f_components)
+
+        def parent_components(
+            typ: lal.TypeDecl, type_def: lal.DerivedTypeDef
+        ) -> Iterator[lal.ComponentDecl]:
+            try:
+                parent = self.designated_type_decl(
+                    type_def.f_subtype_indication
+                )
+            except lal.PropertyError:
+                # Only document the components of the extension when the
+                # parent type cannot be resolved.
+                self.warn(
+                    f"Cannot resolve the parent type of {typ.entity_repr}"
+                )
+            else:
+                yield from type_components(parent)
+
+        def written_discriminants(
+            typ: lal.BaseTypeDecl
+        ) -> List[lal.DiscriminantSpec]:
+            if isinstance(typ, lal.TypeDecl) and isinstance(
+                typ.f_discriminants, lal.KnownDiscriminantPart
+            ):
+                return list(typ.f_discriminants.f_discr_specs)
+            return []
+
+        def list_components(
+            component_list: lal.ComponentList
+        ) -> Iterator[lal.ComponentDecl]:
+            for comp in component_list.f_components:
+                if isinstance(comp, lal.ComponentDecl):
+                    yield comp
+            if component_list.f_variant_part is not None:
+                for variant in component_list.f_variant_part.f_variant:
+                    yield from list_components(variant.f_components)
+
+        comps = itertools.chain(
+            decl.p_discriminants_list() if self.args.resolve
+            else written_discriminants(decl),
+            type_components(decl)
+        )
+        budget = self.args.component_budget
+        if not budget:
+            return list(comps)
+
+        result = list(itertools.islice(comps, budget))
+        if next(comps, None) is not None:
+            self.warn(
+                f"{P.relpath(decl.unit.filename)}:{decl.sloc_range.start}:"
+                f" only the first {budget} components of"
+                f" {decl.p_defining_name.text} are documented"
+            )
+        return result
+
+    def belongs_to(
+        self, decl: lal.BasicDecl, annotations: M.Annotations
+    ) -> Opt[lal.BaseTypeDecl]:
+        """
+        Return the type that the ``belongs-to`` annotation of ``decl`` names,
+        or None if it does not name a type, in which case ``decl`` is
+        documented in its package.
+        """
+        owner = self.declarations.owners.get(decl)
+        if owner is None:
+            self.warn(
+                f"{P.relpath(decl.unit.filename)}:{decl.sloc_range.start}:"
+                f" belongs-to annotation does not name a type:"
+                f" {annotations['belongs-to']}"
+            )
+        return owner
+
+    @staticmethod
+    def written_primitive_type(
+        subp_spec: lal.SubpSpec, written_types: Dict[str, lal.BaseTypeDecl]
+    ) -> Opt[lal.BaseTypeDecl]:
+        """
+        Return the first type of ``written_types`` (lower cased name -> type)
+        that the profile of ``subp_spec`` names as the type of a parameter or
+        as the return type. This approximates the type that a subprogram is a
+        primitive of without name resolution.
+        """
+        type_exprs = [
+            param.f_type_expr for param in subp_spec.f_subp_params.f_params
+        ] if subp_spec.f_subp_params else []
+        if subp_spec.f_subp_returns:
+            type_exprs.append(subp_spec.f_subp_returns)
+
+        for type_expr in type_exprs:
+            typ = written_types.get(written_type_name(type_expr))
+            if typ is not None:
+                return typ
+        return None
+
+    def parent_basic_decl(self, decl: lal.BasicDecl) -> lal.BasicDecl:
+        """
+        Return the declaration in which ``decl`` is declared.
+        """
+        return self.query(
+            "p_parent_basic_decl", decl, lambda: decl.p_parent_basic_decl
+        )
 
     def main(self) -> None:
-        self.lines = []
-        self._indent = 0
-        self._package_nesting_level = 0
+        self.unit_symbols = {}
+        self.unit_diagnostics = {}
+        self.build_manifest = {}
+        self._file_hashes = {}
+        self._documentation = {}
+        self._queries = {}
+        self.stats = Counter()
+        self.profile_summary = timing.ProfileSummary(
+            time.perf_counter() - _start_time
+        )
+        self.written_files = 0
+        self.unchanged_files = 0
+        self.skipped_units = 0
+
+        if self.args.watch is not None:
+            self.args.keep_going = True
+        if self.args.shard_size and self.args.model_directive:
+            self.parser.error(
+                "--shard-size and --model-directive are not compatible"
+            )
 
         os.makedirs(self.args.output_dir, exist_ok=True)
+        self.shard_files = (
+            render_rst.find_shards(self.args.output_dir)
+            if self.args.shard_size else defaultdict(set)
+        )
+        self.build_index()
+        previous_manifest = self.load_build_manifest()
+
+        # Sort unit by filename to have a deterministic processing order. Units
+        # whose inputs did not change since the last run are not processed at
+        # all, and neither are units that are not selected: what the previous
+        # run recorded for them is kept.
+        filenames = []
+        for filename in sorted(self.units):
+            unit = self.units[filename]
+            entry = previous_manifest.pop(unit.filename, None)
+            if not self.is_selected(unit):
+                if entry is not None:
+                    self.reuse_unit(unit.filename, entry)
+            elif (
+                entry is not None and not self.args.force
+                and self.is_up_to_date(unit.filename, entry)
+            ):
+                self.reuse_unit(unit.filename, entry)
+                self.skipped_units += 1
+            else:
+                filenames.append(filename)
+
+        if self.args.unit_patterns:
+            for unit_filename, entry in previous_manifest.items():
+                self.reuse_unit(unit_filename, entry)
+
+        if self.args.cprofile:
+            profiler = cProfile.Profile()
+            profiler.runcall(self.process_units, filenames)
+            profiler.dump_stats(self.args.cprofile)
+        else:
+            self.process_units(filenames)
+        if self.args.watch is not None:
+            self.watch()
+
+        if self.args.profile:
+            wall = time.perf_counter() - _start_time
+            print("\n".join(self.profile_summary.report(wall)))
+            write_if_changed(
+                P.join(self.args.output_dir, PROFILE_SUMMARY),
+                json.dumps(
+                    dict(
+                        self.profile_summary.to_json(wall),
+                        version=generator_version(),
+                    ),
+                    indent=1
+                )
+            )
+
+        if self.report_diagnostics():
+            sys.exit(1)
+
+    def process_units(self, filenames: List[str]) -> None:
+        """
+        Process the units for the given files, then write the manifests of
+        the output directory and print a summary.
+        """
+        jobs = self.args.jobs or os.cpu_count() or 1
+        if (
+            jobs > 1 and len(filenames) > 1 and not self.args.cprofile
+            and "fork" in multiprocessing.get_all_start_methods()
+        ):
+            self.process_units_in_parallel(filenames, jobs)
+        else:
+            for filename in filenames:
+                self.process_unit(self.units[filename])
+
+        symbols: Dict[str, Tuple[str, str]] = {}
+        for unit_filename in sorted(self.unit_symbols):
+            symbols.update(self.unit_symbols[unit_filename])
+        write_if_changed(
+            P.join(self.args.output_dir, SYMBOL_MANIFEST),
+            json.dumps({"symbols": symbols}, indent=1, sort_keys=True)
+        )
+        write_if_changed(
+            P.join(self.args.output_dir, BUILD_MANIFEST),
+            json.dumps(
+                {
+                    "version": generator_version(),
+                    "model_directive": self.args.model_directive,
+                    "resolve": self.args.resolve,
+                    "shard_size": self.args.shard_size,
+                    "units": self.build_manifest,
+                },
+                indent=1, sort_keys=True
+            )
+        )
+
+        print(
+            f"rst files: {self.written_files} written,"
+            f" {self.unchanged_files} unchanged,"
+            f" {self.skipped_units} skipped"
+        )
+        if self.args.verbose:
+            for name, count in sorted(self.stats.items()):
+                print(f"{name}: {count}")
+
+    def watch(self) -> None:
+        """
+        Process again the selected units when their sources or the sources
+        they depend on change, until interrupted. The analysis context is
+        kept from one change to the next, so that only the changed sources
+        are parsed again.
+        """
+        def mtime(filename: str) -> Opt[int]:
+            try:
+                return os.stat(filename).st_mtime_ns
+            except OSError:
+                return None
+
+        if not self.units:
+            return
+
+        context = next(iter(self.units.values())).context
+        watched = {unit.filename for unit in self.units.values()}
+        for entry in self.build_manifest.values():
+            watched.update(entry["dependencies"])
+        mtimes = {filename: mtime(filename) for filename in watched}
+
+        print(f"Watching {len(mtimes)} files, press Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(self.args.watch)
+                changed = {
+                    filename for filename, time_ns in mtimes.items()
+                    if mtime(filename) != time_ns
+                }
+                if not changed:
+                    continue
+
+                for filename in sorted(changed):
+                    mtimes[filename] = mtime(filename)
+                    context.get_from_file(filename, reparse=True)
+
+                # Semantic results may differ now that sources changed
+                self._queries = {}
+                self._file_hashes = {}
+                self.build_index()
+
+                # Units whose dependencies are unknown may depend on anything
+                filenames = []
+                for filename in sorted(self.units):
+                    unit = self.units[filename]
+                    entry = self.build_manifest.get(unit.filename)
+                    if self.is_selected(unit) and (
+                        entry is None
+                        or unit.filename in changed
+                        or not changed.isdisjoint(entry["dependencies"])
+                        or entry["attachments"]
+                        != self.declarations.attachments(unit.filename)
+                    ):
+                        filenames.append(filename)
+
+                self.written_files = 0
+                self.unchanged_files = 0
+                self.skipped_units = 0
+                self.process_units(filenames)
+
+                for entry in self.build_manifest.values():
+                    for dep in entry["dependencies"]:
+                        if dep not in mtimes:
+                            mtimes[dep] = mtime(dep)
+
+                if self.written_files and self.args.watch_command:
+                    subprocess.run(self.args.watch_command, shell=True)
+        except KeyboardInterrupt:
+            pass
+
+    def report_diagnostics(self) -> int:
+        """
+        Write the diagnostics of all units to the ``--report`` file, print
+        them in keep-going mode, and return the number of errors.
+        """
+        diagnostics = {
+            filename: diags
+            for filename, diags in sorted(self.unit_diagnostics.items())
+            if diags
+        }
+        counts = Counter(
+            diag.severity for diags in diagnostics.values() for diag in diags
+        )
+
+        if self.args.report:
+            with open(self.args.report, "w") as f:
+                json.dump(
+                    {
+                        "errors": counts["error"],
+                        "warnings": counts["warning"],
+                        "units": {
+                            filename: [diag._asdict() for diag in diags]
+                            for filename, diags in diagnostics.items()
+                        },
+                    },
+                    f, indent=1
+                )
+
+        if self.args.keep_going:
+            print(
+                f"diagnostics: {counts['error']} errors,"
+                f" {counts['warning']} warnings"
+            )
+            for filename, diags in diagnostics.items():
+                print(f"{filename}:")
+                for diag in diags:
+                    print(f"    {diag.severity}: {diag.message}")
 
-        # Sort unit by filename to have a deterministic processing order
-        for _, unit in sorted(self.units.items()):
-            self.process_unit(unit)
+        return counts["error"]
+
+    def build_index(self) -> None:
+        """
+        Index the declarations of all units, and resolve their
+        ``belongs-to`` annotations.
+        """
+        start = time.perf_counter()
+        self.declarations = index.DeclarationIndex()
+        for filename in sorted(self.units):
+            self.declarations.add_unit(self.units[filename])
+        self.declarations.resolve()
+        self.profile_summary.add_phase("index", time.perf_counter() - start)
+
+    def is_selected(self, unit: lal.AnalysisUnit) -> bool:
+        """
+        Return whether ``unit`` matches one of the ``--unit`` patterns, if
+        any.
+        """
+        patterns = [p.lower() for p in self.args.unit_patterns or []]
+        if not patterns:
+            return True
+
+        names = [unit.filename.lower(), P.basename(unit.filename).lower()]
+        if isinstance(unit.root, lal.CompilationUnit):
+            try:
+                names.append(
+                    ".".join(unit.root.p_syntactic_fully_qualified_name)
+                    .lower()
+                )
+            except lal.PropertyError:
+                pass
+
+        return any(
+            fnmatch.fnmatchcase(name, pattern)
+            for name in names for pattern in patterns
+        )
+
+    def reuse_unit(self, filename: str, entry: dict) -> None:
+        """
+        Keep what the previous run recorded in ``entry`` for the unit in
+        ``filename``, without processing it again.
+        """
+        self.build_manifest[filename] = entry
+        self.unit_symbols[filename] = {
+            name: tuple(symbol) for name, symbol in entry["symbols"].items()
+        }
+        self.unit_diagnostics[filename] = [
+            Diagnostic(*diag) for diag in entry["diagnostics"]
+        ]
+
+    def load_build_manifest(self) -> Dict[str, dict]:
+        """
+        Return the units recorded in the ``BUILD_MANIFEST`` file of the output
+        directory, or an empty mapping if there is none or if it was written
+        by another version of the generator or for another output format.
+        """
+        try:
+            with open(P.join(self.args.output_dir, BUILD_MANIFEST)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # Shards of the previous run are removed when they are not generated
+        # anymore, even if the manifest is not reused.
+        for entry in manifest.get("units", {}).values():
+            if entry.get("output") and entry.get("shards"):
+                self.shard_files[entry["output"]].update(entry["shards"])
+
+        if (
+            manifest.get("version") != generator_version()
+            or manifest.get("model_directive") != self.args.model_directive
+            or manifest.get("resolve") != self.args.resolve
+            or manifest.get("shard_size") != self.args.shard_size
+        ):
+            return {}
+        return manifest["units"]
+
+    def file_hash(self, filename: str) -> Opt[str]:
+        """
+        Return the hash of the content of ``filename``, or None if it cannot
+        be read.
+        """
+        try:
+            return self._file_hashes[filename]
+        except KeyError:
+            pass
+
+        try:
+            with open(filename, "rb") as f:
+                result: Opt[str] = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            result = None
+        self._file_hashes[filename] = result
+        return result
+
+    def is_up_to_date(self, filename: str, entry: dict) -> bool:
+        """
+        Return whether the unit in ``filename`` was processed by a previous
+        run, as recorded in ``entry``, with the same source, dependencies and
+        ``belongs-to`` annotations, and whether the files generated then still
+        exist.
+        """
+        def exists(ext: str, rst_file: Opt[str] = None) -> bool:
+            return P.exists(P.join(
+                self.args.output_dir, f"{rst_file or entry['output']}.{ext}"
+            ))
+
+        return (
+            entry["source"] == self.file_hash(filename)
+            and all(
+                self.file_hash(dep) == dep_hash
+                for dep, dep_hash in entry["dependencies"].items()
+            )
+            and entry["attachments"] == self.declarations.attachments(filename)
+            and (
+                entry["output"] is None
+                or (exists("rst") and (not self.save_model or exists("json")))
+            )
+            and all(exists("rst", shard) for shard in entry["shards"])
+        )
+
+    def unit_dependencies(self, unit: lal.AnalysisUnit) -> Opt[List[str]]:
+        """
+        Return the files of the units that ``unit`` depends on, directly or
+        not, or None if they cannot be computed. Through name resolution, the
+        documentation generated for ``unit`` can depend on any of them. In
+        ``--no-resolve`` mode, it only depends on its own source. In both
+        cases, it also depends on the units declaring entities that are
+        documented in it through ``belongs-to`` annotations.
+        """
+        deps = set(self.declarations.contributors.get(unit.filename, ()))
+        if self.args.resolve:
+            if not isinstance(unit.root, lal.CompilationUnit):
+                return None
+            try:
+                deps.update(
+                    dep.unit.filename for dep in unit.root.p_unit_dependencies
+                )
+            except lal.PropertyError:
+                return None
+        return sorted(deps - {unit.filename})
+
+    def record_unit(
+        self,
+        filename: str,
+        result: Opt[Tuple[str, List[str]]],
+        symbols: Dict[str, Tuple[str, str]],
+        diagnostics: List[Diagnostic],
+        dependencies: Opt[List[str]],
+    ) -> None:
+        """
+        Write the rst file for the unit in ``filename``, given the result of
+        :meth:`render_unit`. Add the timings of the unit to
+        ``profile_summary``, and record its symbols and diagnostics, and its
+        inputs and outputs in ``build_manifest``. Units whose dependencies are
+        unknown or that have errors are not recorded in ``build_manifest``, so
+        that they are processed again on the next run.
+        """
+        if result is not None:
+            with self.profile.phase("output"):
+                self.write_rst(*result)
+        self.profile_summary.add(filename, self.profile)
+        self.unit_symbols[filename] = symbols
+        self.unit_diagnostics[filename] = diagnostics
+        if dependencies is not None and not any(
+            diag.severity == "error" for diag in diagnostics
+        ):
+            self.build_manifest[filename] = {
+                "source": self.file_hash(filename),
+                "dependencies": {
+                    dep: self.file_hash(dep) for dep in dependencies
+                },
+                "output": P.basename(result[0]) if result else None,
+                "shards": (
+                    [P.basename(f) for f in result[1][1:]] if result else []
+                ),
+                "symbols": symbols,
+                "diagnostics": diagnostics,
+                "attachments": self.declarations.attachments(filename),
+            }
 
     @property
     def description(self) -> str:
@@ -207,10 +1031,93 @@ class GenerateDoc(lal.App):
         library level packages are handled
         """
 
+    def process_units_in_parallel(
+        self, filenames: List[str], jobs: int
+    ) -> None:
+        """
+        Process the units for the given files with ``jobs`` worker processes.
+
+        Workers are forked from this process, so each of them works on its own
+        copy of the analysis context, in which all units are already parsed.
+        Results, including the messages that workers print, are handled in the
+        order of ``filenames``, so that the output is the same as when
+        processing units one after the other.
+        """
+        global _worker_app
+        _worker_app = self
+
+        chunksize = max(1, len(filenames) // (jobs * 4))
+        with multiprocessing.get_context("fork").Pool(jobs) as pool:
+            for filename, rendered in zip(
+                filenames,
+                pool.imap(render_unit_in_worker, filenames, chunksize)
+            ):
+                sys.stdout.write(rendered.output)
+                if rendered.exit_code is not None:
+                    pool.terminate()
+                    sys.exit(rendered.exit_code)
+                self.stats.update(rendered.stats)
+                self.profile = rendered.profile
+                self.record_unit(
+                    self.units[filename].filename, rendered.result,
+                    rendered.symbols, rendered.diagnostics,
+                    rendered.dependencies
+                )
+
     def process_unit(self, unit: lal.AnalysisUnit) -> None:
         """
         Process one LAL analysis unit.
         """
+        self.symbols = {}
+        self.diagnostics = []
+        self.profile = timing.UnitProfile(self.args.profile)
+        result = self.render_unit(unit)
+        with self.profile.phase("dependencies"):
+            dependencies = self.unit_dependencies(unit)
+        self.record_unit(
+            unit.filename, result, self.symbols, self.diagnostics,
+            dependencies
+        )
+
+    def write_rst(self, out_file: str, rst_files: List[str]) -> None:
+        """
+        Replace the rst files generated for the unit whose rst file is
+        ``out_file``, all given without extension, with the ``.rst.new`` files
+        just rendered, unless they are unchanged: this keeps Sphinx from
+        considering them outdated. Shards of the unit that are not generated
+        anymore are removed.
+        """
+        for rst_file in rst_files:
+            if render_rst.replace_if_changed(
+                f"{rst_file}.rst.new", f"{rst_file}.rst"
+            ):
+                self.written_files += 1
+            else:
+                self.unchanged_files += 1
+        rst_file = P.basename(out_file)
+        render_rst.remove_stale_shards(
+            out_file, rst_files, self.shard_files.get(rst_file, set())
+        )
+        self.shard_files[rst_file] = {P.basename(f) for f in rst_files[1:]}
+
+    def render_unit(
+        self, unit: lal.AnalysisUnit
+    ) -> Opt[Tuple[str, List[str]]]:
+        """
+        Return the rst file for one LAL analysis unit and all the rst files
+        generated for it, starting with this one, without extension, or None
+        if the unit cannot be documented. The rst text of each is written to
+        a temporary ``.rst.new`` file. Errors in the unit stop the program,
+        unless in keep-going mode.
+
+        The unit is first extracted as a documentation model, which is saved
+        next to the rst file when the ``--model`` option is given, and the rst
+        text is then rendered from it. With ``--model-directive``, the rst
+        text is only a directive that loads the model. With ``--shard-size``,
+        the declarations of large units are documented in several rst files.
+        """
+        self._documentation = {}
+
         if unit.diagnostics:
             self.error('Parsing error in {}'.format(unit.filename))
             for diag in unit.diagnostics:
@@ -221,6 +1128,14 @@ class GenerateDoc(lal.App):
         if not unit.root:
             self.error('{} is empty'.format(unit.filename))
 
+        if any(diag.severity == "error" for diag in self.diagnostics):
+            if not self.args.keep_going:
+                exit(1)
+            return None
+
+        out_file = P.join(self.args.output_dir,
+                          P.basename(P.splitext(unit.filename)[0]))
+
         try:
             decl = (
                 unit.root.cast(lal.CompilationUnit).f_body
@@ -230,31 +1145,62 @@ class GenerateDoc(lal.App):
             if decl.is_a(lal.GenericPackageDecl):
                 gen_package = decl.cast(lal.GenericPackageDecl)
                 package_decl = gen_package.f_package_decl
-                self.handle_package(package_decl, gen_package)
+                package = self.extract_package(
+                    package_decl, gen_package, top_level=True
+                )
             else:
                 package_decl = decl.cast(lal.BasePackageDecl)
-                self.handle_package(package_decl)
-
-            out_file = P.join(self.args.output_dir,
-                              P.basename(P.splitext(unit.filename)[0]))
-            with open(f"{out_file}.rst", "w") as f:
-                f.write("\n".join(line.rstrip() for line in self.lines))
-
-            self.lines = []
+                package = self.extract_package(package_decl, top_level=True)
         except AssertionError:
-            print(f"WARNING: Non handled top level decl: {decl}")
-            return
+            self.warn(f"Non handled top level decl: {decl}")
+            return None
+        except lal.PropertyError as exc:
+            if not self.args.keep_going:
+                raise
+            self.error(f"{unit.filename}: {exc}")
+            return None
+
+        with self.profile.phase("output"):
+            if self.save_model:
+                write_if_changed(f"{out_file}.json", M.dump_model(package))
+
+            if self.args.model_directive:
+                rst_files = [out_file]
+                self.symbols = render_rst.render_stub_to_file(
+                    package, f"{out_file}.rst.new", P.basename(out_file)
+                )
+            else:
+                rst_files, self.symbols = render_rst.render_shards_to_files(
+                    package, out_file, self.args.shard_size
+                )
+        return out_file, rst_files
 
-    def handle_package(
+    @property
+    def save_model(self) -> bool:
+        """
+        Whether the documentation models of units are saved as JSON files.
+        """
+        return self.args.model or self.args.model_directive
+
+    def extract_package(
         self,
         package_decl: lal.BasePackageDecl,
-        gen_package: Opt[lal.GenericPackageDecl] = None
-    ) -> None:
+        gen_package: Opt[lal.GenericPackageDecl] = None,
+        top_level: bool = False,
+    ) -> M.Package:
         """
-        Handle a package declaration. This method is called recursively, to
-        share code, and will have a different behavior when the package is a
-        toplevel one or a nested one.
+        Return the documentation model for a package declaration. This method
+        is called recursively for nested packages.
         """
+        with self.profile.phase("package classification"):
+            return self._extract_package(package_decl, gen_package, top_level)
+
+    def _extract_package(
+        self,
+        package_decl: lal.BasePackageDecl,
+        gen_package: Opt[lal.GenericPackageDecl],
+        top_level: bool,
+    ) -> M.Package:
         # Each declaration can group the documentation of several other
         # declarations. This mapping (decl -> list[decl]) describes this
         # grouping.
@@ -284,6 +1230,10 @@ class GenerateDoc(lal.App):
 
         types = {}
 
+        # Types by lower cased name, to find them from the names written in
+        # the source in --no-resolve mode
+        written_types = {}
+
         for decl in decls:
             _, annotations = self.get_documentation(decl)
 
@@ -291,6 +1241,11 @@ class GenerateDoc(lal.App):
             if annotations.get('no-document'):
                 continue
 
+            # Declarations that belong to a declaration of another package
+            # are documented there.
+            if self.declarations.is_attached_elsewhere(decl):
+                continue
+
             if is_documentable_subp(decl):
                 # Look for the type under which this subprogram should be
                 # documented ("owning_type"). This is either the explicitly
@@ -299,9 +1254,15 @@ class GenerateDoc(lal.App):
                 # same file).
                 owning_type = None
                 if annotations.get('belongs-to'):
-                    owning_type = types[annotations['belongs-to']]
+                    owning_type = self.belongs_to(decl, annotations)
                 else:
-                    prim_type = decl.f_subp_spec.p_primitive_subp_first_type()
+                    prim_type = (
+                        decl.f_subp_spec.p_primitive_subp_first_type()
+                        if self.args.resolve
+                        else self.written_primitive_type(
+                            decl.f_subp_spec, written_types
+                        )
+                    )
                     if prim_type and prim_type.unit == package_decl.unit:
                         owning_type = prim_type
                         append_decl(owning_type)
@@ -316,14 +1277,21 @@ class GenerateDoc(lal.App):
             elif decl.is_a(lal.BaseTypeDecl):
                 # New type declaration: document it and register it as a type
                 types[decl.p_defining_name.text] = decl
+                written_types[decl.p_defining_name.text.lower()] = decl
                 append_decl(decl)
 
             elif decl.is_a(lal.ObjectDecl):
                 # Try to associate object declarations to their type, if there
-                # is one in the current package.
-                type_name = (decl.f_type_expr.p_designated_type_decl
-                             .p_defining_name)
-                t = types.get(type_name.text) if type_name else None
+                # is one in the current package, unless they are explicitly
+                # attached to another declaration.
+                if annotations.get('belongs-to'):
+                    t = self.belongs_to(decl, annotations)
+                elif self.args.resolve:
+                    type_name = (self.designated_type_decl(decl.f_type_expr)
+                                 .p_defining_name)
+                    t = types.get(type_name.text) if type_name else None
+                else:
+                    t = written_types.get(written_type_name(decl.f_type_expr))
                 if t:
                     associated_decls[t].append(decl)
                 else:
@@ -345,105 +1313,129 @@ class GenerateDoc(lal.App):
         # Get documentation for the top-level package itself
         pkg_doc, annotations = self.get_documentation(package_decl)
 
-        # Create the documentation's content
-
-        # Create a section
-        pkg_name = package_decl.p_fully_qualified_name
-        self.add_lines([''])
-
-        def handle_decl(decl):
+        def extract_decl(decl):
             if decl.is_a(lal.PackageDecl):
-                self.handle_package(decl)
+                return self.extract_package(decl)
             elif decl.is_a(lal.GenericPackageDecl):
-                self.handle_package(decl.f_package_decl, gen_package=decl)
+                return self.extract_package(
+                    decl.f_package_decl, gen_package=decl
+                )
             else:
-                self.handle_entity(decl)
-                with self.indent():
-                    for assoc_decls in associated_decls[decl]:
-                        self.handle_entity(assoc_decls)
-
-        if self._package_nesting_level == 0:
-            self.add_string(
-                f"{pkg_name }\n"
-                f"{UNDERLINES[self._package_nesting_level] * len(pkg_name )}"
-            )
-            self.add_lines(['', f".. ada:set_package:: {pkg_name}"])
+                entity = self.extract_entity(decl)
+                entity.associated = [
+                    self.extract_entity(assoc_decl)
+                    for assoc_decl in (
+                        associated_decls[decl]
+                        + self.declarations.attached.get(decl, [])
+                    )
+                ]
+                return entity
+
+        if top_level:
+            kind = "module"
+        elif gen_package is not None:
+            kind = "generic_package"
         else:
-            generic = "generic_" if gen_package is not None else ""
-            self.add_lines([f".. ada:{generic}package:: {pkg_name}", ""])
-            self._indent += 4
-
-        self.add_lines([''] + pkg_doc + [''])
-
-        if gen_package is not None:
-            self.add_lines([':Formals:'])
-
-            with self.indent():
-                for decl in gen_package.f_formal_part.f_decls:
-                    handle_decl(decl)
-
-        # Go through all entities to generate their documentation
-        self._package_nesting_level += 1
-        for decl in toplevel_decls:
-            handle_decl(decl)
-        self._package_nesting_level -= 1
-
-        if self._package_nesting_level != 0:
-            self._indent -= 4
-
-    def handle_entity(self, decl: lal.BasicDecl):
+            kind = "package"
+
+        return M.Package(
+            kind=kind,
+            name=self.fully_qualified_name(package_decl),
+            doc=pkg_doc,
+            annotations=annotations,
+            formals=(
+                None if gen_package is None
+                else [extract_decl(decl)
+                      for decl in gen_package.f_formal_part.f_decls]
+            ),
+            items=[extract_decl(decl) for decl in toplevel_decls],
+        )
 
-        def make_profile(s: lal.BaseSubpSpec) -> str:
+    def extract_entity(self, decl: lal.BasicDecl) -> M.Entity:
+        """
+        Return the documentation model for a declaration, without the
+        declarations associated to it.
+        """
+        with self.profile.phase("entity extraction") as phase:
+            result = self._extract_entity(decl)
+            kind = result.kind or "unhandled"
+            phase.name = f"{kind} extraction"
+        if self.profile.enabled:
+            self.profile.entity(phase.elapsed, kind, decl.entity_repr)
+        return result
+
+    def _extract_entity(self, decl: lal.BasicDecl) -> M.Entity:
+
+        def make_profile(
+            s: lal.BaseSubpSpec
+        ) -> Tuple[str, List[M.Parameter], Opt[str]]:
             """
             Reconstruct a text profile for given subprogram spec, with fully
-            qualified type names.
+            qualified type names. Also return its parameters and return type.
             """
 
             def typ(te: lal.TypeExpr) -> str:
                 # TODO: Anonymous types are not handled fully yet: we just
                 # grab their text, but we should expand inner type names too to
                 # be fully qualified.
-                if te.is_a(lal.AnonymousType):
+                if te.is_a(lal.AnonymousType) or not self.args.resolve:
                     return strip_ws(te.text)
                 else:
-                    return te.p_designated_type_decl.p_fully_qualified_name
+                    return self.fully_qualified_name(
+                        self.designated_type_decl(te)
+                    )
 
-            params = "({})".format("; ".join(
-                f"{strip_ws(p.f_ids.text)} : "
-                f"{typ(p.f_type_expr)}"
+            parameters = [
+                M.Parameter([i.text for i in p.f_ids], typ(p.f_type_expr))
                 for p in s.f_subp_params.f_params
+            ] if s.f_subp_params else []
+            params = "({})".format("; ".join(
+                f"{strip_ws(p.f_ids.text)} : {param.type}"
+                for p, param in zip(s.f_subp_params.f_params, parameters)
             )) if s.f_subp_params else ""
 
-            returns = (
-                f"return {typ(s.f_subp_returns)}" if s.f_subp_returns else ""
-            )
+            return_type = typ(s.f_subp_returns) if s.f_subp_returns else None
+            returns = f"return {return_type}" if return_type else ""
             ret = (
                 f"{s.f_subp_kind.text} {s.f_subp_name.text}"
                 f" {params} {returns}"
             )
-            return ret
+            return ret, parameters, return_type
 
         # Get the documentation content
         doc, annotations = self.get_documentation(decl)
 
-        def emit_directive(directive_header):
-            self.add_lines([directive_header])
-            with self.indent():
-                self.add_lines([
-                    ":package: "
-                    f"{decl.p_parent_basic_decl.p_fully_qualified_name}"
-                ])
+        def entity(
+            kind: str, signature: str, fields: Opt[List[M.Field]] = None,
+            code: Opt[List[str]] = None
+        ) -> M.Entity:
+            """
+            Return the model for ``decl``, documented with the ``kind``
+            directive of the Ada domain.
+            """
+            return M.Entity(
+                kind=kind,
+                name=decl.p_defining_name.text,
+                signature=signature,
+                package=self.fully_qualified_name(
+                    self.parent_basic_decl(decl)
+                ),
+                doc=doc,
+                annotations=annotations,
+                fields=fields or [],
+                code=code,
+            )
 
         if is_documentable_subp(decl):
             subp_spec = decl.p_subp_spec_or_null()
-            prof = make_profile(subp_spec)
+            prof, parameters, return_type = make_profile(subp_spec)
             subp_kind = (
                 'procedure' if subp_spec.p_returns is None
                 else 'function'
             )
-            emit_directive(f".. ada:{subp_kind}:: {prof}")
 
-            for formal in decl.p_subp_spec_or_null().p_abstract_formal_params:
+            params = []
+            for formal in subp_spec.p_abstract_formal_params:
                 formal_doc, annots = self.get_documentation(formal)
 
                 # Only generate a param profile if you have doc to show.
@@ -452,62 +1444,72 @@ class GenerateDoc(lal.App):
                 # has doc.
                 if formal_doc:
                     for i in formal.p_defining_names:
-                        fqn = formal.p_formal_type().p_fully_qualified_name
-                        self.add_string(f":param {fqn} {i.text}:")
-                        with self.indent():
-                            self.add_lines(doc)
+                        fqn = (
+                            self.fully_qualified_name(self.formal_type(formal))
+                            if self.args.resolve
+                            else strip_ws(formal.p_type_expression.text)
+                        )
+                        params.append(
+                            M.Field("param", f"{fqn} {i.text}", formal_doc)
+                        )
+
+            result = entity(subp_kind, prof, params)
+            result.parameters = parameters
+            result.returns = return_type
+            return result
 
         elif isinstance(decl, lal.BaseTypeDecl):
             if isinstance(decl, lal.IncompleteTypeDecl):
-                return
+                return M.Entity("incomplete_type", decl.p_defining_name.text,
+                                "", "")
 
             prof = f"type {decl.p_relative_name.text}"
-            emit_directive(f".. ada:type:: {prof}")
-
-            with self.indent():
-                self.add_lines([''])
-
-                # Register components (discriminants and fields)
-                comps: Dict[lal.BaseFormalParamDecl,
-                            Set[Tuple[lal.DiscriminantValues]]] = {}
-
-                if decl.p_is_access_type():
-                    pass
-                elif decl.p_is_record_type():
-                    try:
-                        for shape in decl.p_shapes():
-                            for comp in shape.components:
-                                ctx = comp.parent.parent.parent
-                                s = comps.setdefault(comp, set())
-                                if not ctx.is_a(lal.Variant):
-                                    s.add(tuple(shape.discriminants_values))
-                    except lal.PropertyError:
-                        # TODO TA20-019: p_shapes will fail on some types that
-                        # are considered records, so we should not crash on
-                        # this.
-                        pass
-                else:
-                    for comp in decl.p_discriminants_list():
-                        comps[comp] = set()
-
-                # Emit components
-                for comp, discrs in comps.items():
-                    inner_doc, annots = self.get_documentation(comp)
-                    for dn in comp.p_defining_names:
-                        formal_type = comp.p_formal_type()
+
+            # Register components (discriminants and fields)
+            comps: List[lal.BaseFormalParamDecl] = []
+
+            if not self.args.resolve:
+                comps = self.record_components(decl)
+            elif decl.p_is_access_type():
+                pass
+            elif decl.p_is_record_type():
+                try:
+                    comps = self.record_components(decl)
+                except lal.PropertyError:
+                    self.warn(
+                        f"Cannot find the components of {decl.entity_repr}"
+                    )
+            else:
+                comps = decl.p_discriminants_list()
+
+            # Document components
+            fields = []
+            for comp in comps:
+                inner_doc, annots = self.get_documentation(comp)
+                for dn in comp.p_defining_names:
+                    if not self.args.resolve:
+                        type_expr = comp.p_type_expression
+                        if type_expr.is_a(lal.AnonymousType):
+                            tn = f"``{type_expr.text}``"
+                        else:
+                            tn = strip_ws(type_expr.text)
+                    else:
+                        formal_type = self.formal_type(comp)
                         if formal_type.is_a(lal.AnonymousTypeDecl):
                             tn = "``{}``".format(
                                 formal_type.text
                             )
                         else:
-                            tn = comp.p_formal_type().p_fully_qualified_name
-                        comp_kind = (
-                            "discriminant" if comp.is_a(lal.DiscriminantSpec)
-                            else "component"
-                        )
-                        self.add_string(f":{comp_kind} {tn} {dn.text}:")
-                        with self.indent():
-                            self.add_lines(inner_doc)
+                            tn = self.fully_qualified_name(formal_type)
+                    comp_kind = (
+                        "discriminant" if comp.is_a(lal.DiscriminantSpec)
+                        else "component"
+                    )
+                    fields.append(
+                        M.Field(comp_kind, f"{tn} {dn.text}", inner_doc)
+                    )
+
+            return entity("type", prof, fields)
 
         elif isinstance(decl, lal.ObjectDecl):
             default_expr = None
@@ -532,62 +1534,147 @@ class GenerateDoc(lal.App):
                 decl.token_start, last_token
             ))
 
-            emit_directive(f".. ada:object:: {descr}")
-
-            with self.indent():
-                self.add_lines([''])
-                typ = decl.p_type_expression.p_designated_type_decl
+            fields = []
+            if not self.args.resolve:
+                if decl.p_type_expression.is_a(lal.AnonymousType):
+                    typ_str = f"``{decl.p_type_expression.text}``"
+                else:
+                    typ_str = strip_ws(decl.p_type_expression.text)
+            else:
+                typ = self.designated_type_decl(decl.p_type_expression)
                 if typ.is_a(lal.AnonymousTypeDecl):
                     typ_str = f"``{decl.p_type_expression.text}``"
                 else:
-                    typ_str = typ.p_fully_qualified_name
-                if not decl.parent.is_a(lal.GenericFormal):
-                    self.add_string(f":objtype: {typ_str}")
-                    if default_expr:
-                        self.add_string(
-                            f":defval: ``{strip_ws(default_expr)}``"
-                        )
-                    if decl.f_renaming_clause:
-                        self.add_string(
-                            ":renames: "
-                            f"{decl.f_renaming_clause.f_renamed_object.text}"
-                        )
+                    typ_str = self.fully_qualified_name(typ)
+            if not decl.parent.is_a(lal.GenericFormal):
+                fields.append(M.Field("objtype", None, [typ_str]))
+                if default_expr:
+                    fields.append(M.Field(
+                        "defval", None, [f"``{strip_ws(default_expr)}``"]
+                    ))
+                if decl.f_renaming_clause:
+                    fields.append(M.Field(
+                        "renames", None,
+                        decl.f_renaming_clause.f_renamed_object.text
+                        .splitlines()
+                    ))
+
+            return entity("object", descr, fields)
 
         elif isinstance(decl, lal.PackageRenamingDecl):
             name = decl.p_defining_name.text
-            renames = decl.p_renamed_package.p_defining_name.text
-            emit_directive(f".. ada:package:: {name}")
-            with self.indent():
-                self.add_lines([''])
-                self.add_string(f":renames: {renames}")
+            renames = (
+                decl.p_renamed_package.p_defining_name.text
+                if self.args.resolve
+                else decl.f_renames.f_renamed_object.text
+            )
+            return entity(
+                "package", name, [M.Field("renames", None, [renames])]
+            )
 
         elif isinstance(decl, lal.ExceptionDecl):
-            name = decl.p_defining_name.text
-            emit_directive(f".. ada:exception:: {name}")
+            return entity("exception", decl.p_defining_name.text)
 
         elif isinstance(decl, lal.GenericPackageInstantiation):
             sig = strip_ws(lal.Token.text_range(
                 decl.token_start, decl.f_generic_pkg_name.token_end
             ))
-            emit_directive(f".. ada:generic-package-instantiation:: {sig}")
-            with self.indent():
-                self.add_lines([''])
-                self.add_string(".. code-block:: ada")
-                with self.indent():
-                    self.add_lines([''] + decl.text.splitlines())
-                self.add_lines([''])
-                self.add_string(
-                    ":instpkg: "
-                    f"{decl.p_designated_generic_decl.p_fully_qualified_name}"
-                )
+            instpkg = (
+                self.fully_qualified_name(decl.p_designated_generic_decl)
+                if self.args.resolve
+                else decl.f_generic_pkg_name.text
+            )
+            return entity(
+                "generic-package-instantiation", sig,
+                [M.Field("instpkg", None, [instpkg])],
+                code=decl.text.splitlines()
+            )
+
         elif isinstance(decl, lal.GenericFormal):
-            self.handle_entity(decl.f_decl)
-            return
+            return self.extract_entity(decl.f_decl)
+
         else:
-            print(f"WARNING: Non handled entity: {decl}")
+            self.warn(f"Non handled entity: {decl}")
+            return M.Entity(None, "", "", "", doc, annotations)
+
+
+_worker_app: Opt[GenerateDoc] = None
+"""
+Application whose units worker processes render, inherited from the parent
+process, which sets it before forking them.
+"""
+
+
+class RenderedUnit(NamedTuple):
+    """
+    Result of the processing of a unit in a worker process.
+    """
+
+    result: Opt[Tuple[str, List[str]]]
+    """
+    Result of :meth:`GenerateDoc.render_unit`.
+    """
+
+    symbols: Dict[str, Tuple[str, str]]
+    """
+    Entities documented in the unit.
+    """
+
+    diagnostics: List[Diagnostic]
+    """
+    Diagnostics reported for the unit.
+    """
+
+    dependencies: Opt[List[str]]
+    """
+    Result of :meth:`GenerateDoc.unit_dependencies`.
+    """
 
-        with self.indent():
-            self.add_lines([''] + doc + [''])
+    stats: Counter
+    """
+    Statistics about the processing of the unit.
+    """
+
+    profile: timing.UnitProfile
+    """
+    Times of the processing phases of the unit.
+    """
+
+    output: str
+    """
+    What the processing of the unit printed.
+    """
+
+    exit_code: Opt[int]
+    """
+    Exit code, if the processing of the unit exited because of an error.
+    """
+
+
+def render_unit_in_worker(filename: str) -> RenderedUnit:
+    """
+    Render the unit for ``filename`` in a worker process.
+    """
+    app = _worker_app
+    assert app is not None
+    app.symbols = {}
+    app.diagnostics = []
+    app.stats = Counter()
+    app.profile = timing.UnitProfile(app.args.profile)
+    output = io.StringIO()
+    result, dependencies, exit_code = None, None, None
+    with redirect_stdout(output):
+        try:
+            unit = app.units[filename]
+            result = app.render_unit(unit)
+            with app.profile.phase("dependencies"):
+                dependencies = app.unit_dependencies(unit)
+        except SystemExit as exc:
+            exit_code = exc.code if isinstance(exc.code, int) else 1
+    return RenderedUnit(
+        result, app.symbols, app.diagnostics, dependencies, app.stats,
+        app.profile, output.getvalue(), exit_code
+    )
 
 
 if __name__ == '__main__':
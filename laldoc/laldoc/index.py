@@ -0,0 +1,193 @@
+"""
+Project-wide index of the declarations that ``laldoc.generate_rst``
+documents.
+
+The index is built in a single syntactic pass over all units before any of
+them is documented. It maps the fully qualified names of declarations to
+the declarations, and it resolves ``belongs-to`` annotations once, so that
+entities can be documented with declarations of other packages or units.
+"""
+
+from collections import defaultdict
+from typing import Dict, List, Optional as Opt, Set, Tuple
+
+import libadalang as lal
+
+
+def is_documentable_subp(node: lal.BasicDecl):
+    """
+    Return whether ``node`` is part of the class of subprogram declarations we
+    want to document.
+    """
+    return node.is_a(
+        lal.BasicSubpDecl, lal.ExprFunction,
+        lal.SubpRenamingDecl, lal.NullSubpDecl
+    )
+
+
+def can_belong_to(node: lal.BasicDecl) -> bool:
+    """
+    Return whether ``node`` can be documented under another declaration with
+    a ``belongs-to`` annotation.
+    """
+    return is_documentable_subp(node) or node.is_a(lal.ObjectDecl)
+
+
+class DeclarationIndex:
+    """
+    Declarations of the public parts of library level packages, including
+    nested packages, by lower cased fully qualified name.
+    """
+
+    def __init__(self) -> None:
+        self.declarations: Dict[str, Tuple[lal.BasicDecl, str]] = {}
+        """
+        Lower cased fully qualified name -> (declaration, fully qualified name
+        of its package). Only the first of overloaded declarations is kept.
+        """
+
+        self.owners: Dict[lal.BasicDecl, lal.BaseTypeDecl] = {}
+        """
+        Declaration with a ``belongs-to`` annotation -> type under which it is
+        documented.
+        """
+
+        self.attached: Dict[lal.BaseTypeDecl, List[lal.BasicDecl]] = (
+            defaultdict(list)
+        )
+        """
+        Type -> declarations of other packages documented under it.
+        """
+
+        self.contributors: Dict[str, Set[str]] = defaultdict(set)
+        """
+        Unit filename -> filenames of the units declaring entities documented
+        in it.
+        """
+
+        self.unit_attachments: Dict[str, Set[str]] = defaultdict(set)
+        """
+        Unit filename -> ``"<entity> -> <owner>"`` descriptions of the
+        ``belongs-to`` annotations that affect its documentation, an unknown
+        owner being ``?``. The documentation of a unit must be generated
+        again when they change.
+        """
+
+        self._attached_decls: Set[lal.BasicDecl] = set()
+        self._pending: List[Tuple[lal.BasicDecl, str, str]] = []
+
+    def add_unit(self, unit: lal.AnalysisUnit) -> None:
+        """
+        Add the declarations of the library level package of ``unit``.
+        Annotations are only resolved by :meth:`resolve`, once all units are
+        added.
+        """
+        if not isinstance(unit.root, lal.CompilationUnit):
+            return
+        item = unit.root.f_body
+        if not isinstance(item, lal.LibraryItem):
+            return
+
+        try:
+            name = ".".join(unit.root.p_syntactic_fully_qualified_name)
+        except lal.PropertyError:
+            return
+        self.add_package(item.f_item, name)
+
+    def add_package(self, decl: lal.BasicDecl, name: str) -> None:
+        """
+        Add the declarations of the package ``decl``, whose fully qualified
+        name is ``name``.
+        """
+        if isinstance(decl, lal.GenericPackageDecl):
+            decl = decl.f_package_decl
+        if not isinstance(decl, lal.BasePackageDecl):
+            return
+
+        for child in decl.f_public_part.f_decls:
+            if not isinstance(child, lal.BasicDecl):
+                continue
+            for defining_name in child.p_defining_names:
+                fqn = f"{name}.{defining_name.text}"
+
+                # The full declaration of a type that has an incomplete one
+                # comes last, and is the one that is documented.
+                if isinstance(child, lal.BaseTypeDecl):
+                    self.declarations[fqn.lower()] = (child, name)
+                else:
+                    self.declarations.setdefault(fqn.lower(), (child, name))
+                if isinstance(
+                    child, (lal.PackageDecl, lal.GenericPackageDecl)
+                ):
+                    self.add_package(child, fqn)
+
+            if not can_belong_to(child):
+                continue
+            try:
+                annotations = {
+                    a.key: a.value for a in child.p_doc_annotations
+                }
+            except lal.PropertyError:
+                continue
+            if annotations.get("belongs-to"):
+                self._pending.append((child, name, annotations["belongs-to"]))
+
+    def resolve(self) -> None:
+        """
+        Resolve the ``belongs-to`` annotations of the added declarations to
+        types. Names are looked up relative to the package of the annotated
+        declaration, then as fully qualified names. Annotations that do not
+        name a type are left unresolved.
+        """
+        for decl, package, target in self._pending:
+            filename = decl.unit.filename
+            description = f"{package}.{decl.p_defining_name.text} -> "
+
+            found = next(
+                (
+                    found
+                    for found in (
+                        self.lookup(f"{package}.{target}"),
+                        self.lookup(target),
+                    )
+                    if found and isinstance(found[0], lal.BaseTypeDecl)
+                ),
+                None
+            )
+            if found is None:
+                self.unit_attachments[filename].add(f"{description}?")
+                continue
+
+            owner, owner_package = found
+            self.owners[decl] = owner
+            description += f"{owner_package}.{owner.p_defining_name.text}"
+            self.unit_attachments[filename].add(description)
+            if owner_package != package:
+                owner_filename = owner.unit.filename
+                self.attached[owner].append(decl)
+                self._attached_decls.add(decl)
+                self.unit_attachments[owner_filename].add(description)
+                if owner_filename != filename:
+                    self.contributors[owner_filename].add(filename)
+        self._pending = []
+
+    def lookup(self, name: str) -> Opt[Tuple[lal.BasicDecl, str]]:
+        """
+        Return the declaration whose fully qualified name is ``name``, and
+        the name of its package, if any.
+        """
+        return self.declarations.get(name.lower())
+
+    def is_attached_elsewhere(self, decl: lal.BasicDecl) -> bool:
+        """
+        Return whether ``decl`` is documented with a declaration of another
+        package.
+        """
+        return decl in self._attached_decls
+
+    def attachments(self, filename: str) -> List[str]:
+        """
+        Return the descriptions of the annotations that affect the
+        documentation of the unit in ``filename``.
+        """
+        return sorted(self.unit_attachments.get(filename, ()))
@@ -0,0 +1,248 @@
+"""
+Documentation model extracted by laldoc from Ada sources.
+
+``laldoc.generate_rst`` first runs the Libadalang analysis of a unit to build
+a model of what to document: packages, the entities they declare, their
+profiles, components, documentation and annotations. Output formats are then
+rendered from this model only, so that rendering never needs Libadalang.
+
+Models are serialized as JSON. Each object has a ``class`` key, either
+``"package"`` or ``"entity"``, and the other keys are the attributes of the
+corresponding class below.
+"""
+
+from dataclasses import dataclass, field
+import json
+from typing import Any, Dict, List, Optional as Opt, Union
+
+
+MODEL_VERSION = 1
+"""
+Version of the JSON format of models, stored in model files.
+"""
+
+Annotations = Dict[str, Union[bool, str, None]]
+
+
+@dataclass
+class Field:
+    """
+    Field of the Ada domain directive documenting an entity.
+
+    Fields with an argument, such as ``:component Standard.Integer X:``, have
+    ``content`` as their body. Fields without argument, such as ``:objtype:``,
+    have ``content`` inline.
+    """
+
+    name: str
+    argument: Opt[str] = None
+    content: List[str] = field(default_factory=list)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "argument": self.argument,
+            "content": self.content,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Field":
+        return cls(data["name"], data["argument"], data["content"])
+
+
+@dataclass
+class Parameter:
+    """
+    Parameter specification in the profile of a subprogram.
+    """
+
+    names: List[str]
+
+    type: str
+    """
+    Fully qualified name of the type of the parameters, or text of their
+    anonymous type.
+    """
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"names": self.names, "type": self.type}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Parameter":
+        return cls(data["names"], data["type"])
+
+
+@dataclass
+class Entity:
+    """
+    Documented entity, other than a package that declares other entities.
+    """
+
+    kind: Opt[str]
+    """
+    Name of the Ada domain directive that documents this entity, or
+    ``"incomplete_type"`` for incomplete type declarations, which are not
+    documented themselves. None if laldoc does not know how to document this
+    kind of entity, in which case only its documentation is output.
+    """
+
+    name: str
+    """
+    Defining name of the entity.
+    """
+
+    signature: str
+    """
+    Argument of the directive, for instance the profile of a subprogram.
+    """
+
+    package: str
+    """
+    Fully qualified name of the package declaring the entity.
+    """
+
+    doc: List[str] = field(default_factory=list)
+    annotations: Annotations = field(default_factory=dict)
+    fields: List[Field] = field(default_factory=list)
+
+    code: Opt[List[str]] = None
+    """
+    Ada code to show, for instance the text of generic instantiations.
+    """
+
+    parameters: List[Parameter] = field(default_factory=list)
+    """
+    Parameters of subprograms, as in ``signature``.
+    """
+
+    returns: Opt[str] = None
+    """
+    Return type of functions, as in ``signature``.
+    """
+
+    associated: List["Entity"] = field(default_factory=list)
+    """
+    Entities documented together with this one, for instance the primitives
+    of a type.
+    """
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "class": "entity",
+            "kind": self.kind,
+            "name": self.name,
+            "signature": self.signature,
+            "package": self.package,
+            "doc": self.doc,
+            "annotations": self.annotations,
+            "fields": [f.to_json() for f in self.fields],
+            "code": self.code,
+            "parameters": [p.to_json() for p in self.parameters],
+            "returns": self.returns,
+            "associated": [e.to_json() for e in self.associated],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Entity":
+        return cls(
+            kind=data["kind"],
+            name=data["name"],
+            signature=data["signature"],
+            package=data["package"],
+            doc=data["doc"],
+            annotations=data["annotations"],
+            fields=[Field.from_json(f) for f in data["fields"]],
+            code=data["code"],
+            parameters=[Parameter.from_json(p) for p in data["parameters"]],
+            returns=data["returns"],
+            associated=[Entity.from_json(e) for e in data["associated"]],
+        )
+
+
+@dataclass
+class Package:
+    """
+    Documented package and the entities it declares.
+    """
+
+    kind: str
+    """
+    ``"module"`` for library level packages, ``"package"`` or
+    ``"generic_package"`` for nested ones.
+    """
+
+    name: str
+    """
+    Fully qualified name of the package.
+    """
+
+    doc: List[str] = field(default_factory=list)
+    annotations: Annotations = field(default_factory=dict)
+
+    formals: Opt[List[Entity]] = None
+    """
+    Generic formals, for generic packages.
+    """
+
+    items: List[Union["Package", Entity]] = field(default_factory=list)
+    """
+    Documented declarations, in documentation order.
+    """
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "class": "package",
+            "kind": self.kind,
+            "name": self.name,
+            "doc": self.doc,
+            "annotations": self.annotations,
+            "formals": (
+                None if self.formals is None
+                else [e.to_json() for e in self.formals]
+            ),
+            "items": [i.to_json() for i in self.items],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Package":
+        return cls(
+            kind=data["kind"],
+            name=data["name"],
+            doc=data["doc"],
+            annotations=data["annotations"],
+            formals=(
+                None if data["formals"] is None
+                else [Entity.from_json(e) for e in data["formals"]]
+            ),
+            items=[item_from_json(i) for i in data["items"]],
+        )
+
+
+def item_from_json(data: Dict[str, Any]) -> Union[Package, Entity]:
+    """
+    Return the package or entity serialized as ``data``.
+    """
+    return (Package if data["class"] == "package" else Entity).from_json(data)
+
+
+def dump_model(package: Package) -> str:
+    """
+    Return the JSON text for the model of a library level package.
+    """
+    return json.dumps(
+        {"version": MODEL_VERSION, "package": package.to_json()}, indent=1
+    )
+
+
+def load_model(filename: str) -> Package:
+    """
+    Load the model of a library level package from the JSON file
+    ``filename``.
+    """
+    with open(filename) as f:
+        data = json.load(f)
+    if data.get("version") != MODEL_VERSION:
+        raise ValueError(
+            f"{filename}: unsupported model version {data.get('version')}"
+        )
+    return Package.from_json(data["package"])
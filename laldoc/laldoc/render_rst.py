@@ -0,0 +1,436 @@
+#! /usr/bin/env python
+"""
+Rendering of laldoc documentation models as rst files for the Ada domain.
+
+``laldoc.generate_rst`` uses this module to write the rst files for the units
+it analyzes. Running this module as a program renders again rst files from
+the models that ``laldoc.generate_rst --model`` saves, without any Libadalang
+analysis::
+
+    python -m laldoc.render_rst -O doc/api doc/api/*.json
+
+Large packages can be split in several rst files, so that Sphinx can read them
+in parallel and only read again the ones that changed: see
+:func:`shard_items`.
+"""
+
+import argparse
+from collections import defaultdict
+from contextlib import contextmanager
+import filecmp
+import os
+from os import path as P
+import re
+from typing import (
+    Dict, Iterator, List, Optional as Opt, Set, TextIO, Tuple, Union
+)
+
+from laldoc.model import Entity, Package, load_model
+
+
+UNDERLINES = ["-", "^", "\""]
+
+SHARD_RE = re.compile(r"(.*)-\d+\.rst$")
+"""
+Names of the rst files of shards, the group being the rst file of their
+package (without extension).
+"""
+
+KINDS_WITH_FIELD_BLOCK = (
+    "type", "object", "package", "generic-package-instantiation"
+)
+"""
+Kinds of entities whose fields are output in a block separated from the
+header of the directive by an empty line, even if they have no fields.
+"""
+
+
+def replace_if_changed(new_file: str, filename: str) -> bool:
+    """
+    Rename ``new_file`` to ``filename``, unless ``filename`` already has the
+    same content, in which case ``new_file`` is removed. Return whether
+    ``filename`` was replaced.
+    """
+    try:
+        if filecmp.cmp(new_file, filename, shallow=False):
+            os.remove(new_file)
+            return False
+    except OSError:
+        pass
+
+    os.replace(new_file, filename)
+    return True
+
+
+class RstEmitter:
+    """
+    Write rst text to a file line by line, keeping track of the current
+    indentation, so that units are never held in memory as a whole.
+
+    Trailing whitespace is stripped from lines, and the last line does not end
+    with a newline.
+    """
+
+    def __init__(self, file: TextIO) -> None:
+        self.file = file
+        self.indentation = 0
+        self._first_line = True
+
+    def add_string(self, strn: str) -> None:
+        """
+        Add ``strn`` to the rst output.
+        """
+        self.add_lines(strn.splitlines())
+
+    def add_lines(self, lines: List[str]) -> None:
+        """
+        Add given lines to the rst output.
+        """
+        for line in lines:
+            if self._first_line:
+                self._first_line = False
+            else:
+                self.file.write("\n")
+            self.file.write(f"{' ' * self.indentation}{line}".rstrip())
+
+    @contextmanager
+    def indent(self) -> Iterator[None]:
+        """
+        Context manager to indent rst code emitted inside the with block.
+        """
+        try:
+            self.indentation += 4
+            yield
+        finally:
+            self.indentation -= 4
+
+
+def collect_symbols(
+    package: Union[Package, Entity], rst_file: str
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Return the entities documented for ``package`` in the rst file
+    ``rst_file`` (without extension): fully qualified name -> (name of the rst
+    file, kind of the Ada domain object). ``package`` can also be an entity
+    documented with the entities associated to it.
+    """
+    symbols: Dict[str, Tuple[str, str]] = {}
+
+    def collect(item: Union[Package, Entity]) -> None:
+        if isinstance(item, Package):
+            symbols[item.name] = (rst_file, item.kind)
+            for sub_item in (item.formals or []) + item.items:
+                collect(sub_item)
+        else:
+            if item.kind is not None and item.kind != "incomplete_type":
+                symbols[f"{item.package}.{item.name}"] = (rst_file, item.kind)
+            for entity in item.associated:
+                collect(entity)
+
+    collect(package)
+    return symbols
+
+
+def shard_items(
+    package: Package, shard_size: int
+) -> List[List[Union[Package, Entity]]]:
+    """
+    Split the declarations of the library level ``package`` in shards, each
+    documented in its own rst file: one per nested package, and one per group
+    of at most ``shard_size`` consecutive other declarations. Return no shards
+    if ``shard_size`` is 0 or if the package does not declare more than
+    ``shard_size`` entities, in which case it is documented in one file.
+    """
+    if shard_size <= 0 or len(package.items) <= shard_size:
+        return []
+
+    shards: List[List[Union[Package, Entity]]] = []
+    group: List[Union[Package, Entity]] = []
+    for item in package.items:
+        if isinstance(item, Package):
+            if group:
+                shards.append(group)
+                group = []
+            shards.append([item])
+        else:
+            group.append(item)
+            if len(group) == shard_size:
+                shards.append(group)
+                group = []
+    if group:
+        shards.append(group)
+    return shards
+
+
+def shard_title(items: List[Union[Package, Entity]]) -> str:
+    """
+    Return the title of the rst file documenting ``items``: the name of the
+    nested package or the names of the first and last entities.
+    """
+    names = [items[0].name, items[-1].name]
+    if names[0] == names[1]:
+        names.pop()
+    return " - ".join(re.sub(r"([\\*`|])", r"\\\1", n) for n in names)
+
+
+class RstRenderer:
+    """
+    Render the model of a library level package as rst.
+    """
+
+    def __init__(self, rst: RstEmitter) -> None:
+        self.rst = rst
+
+    def render_item(self, item: Union[Package, Entity]) -> None:
+        """
+        Render a declaration of a package.
+        """
+        if isinstance(item, Package):
+            self.render_package(item)
+        else:
+            self.render_entity(item)
+            with self.rst.indent():
+                for entity in item.associated:
+                    self.render_item(entity)
+
+    def render_package(
+        self, package: Package, shard_files: Opt[List[str]] = None
+    ) -> None:
+        """
+        Render a package. Library level packages start a new section, while
+        nested ones are documented with a nesting directive.
+
+        If ``shard_files`` is given, the declarations of the library level
+        package are documented in these rst files, which are only listed in a
+        toctree.
+        """
+        rst = self.rst
+        top_level = package.kind == "module"
+        rst.add_lines([''])
+
+        if top_level:
+            rst.add_string(
+                f"{package.name}\n{UNDERLINES[0] * len(package.name)}"
+            )
+            rst.add_lines(['', f".. ada:set_package:: {package.name}"])
+        else:
+            rst.add_lines([f".. ada:{package.kind}:: {package.name}", ""])
+            rst.indentation += 4
+
+        rst.add_lines([''] + package.doc + [''])
+
+        if package.formals is not None:
+            rst.add_lines([':Formals:'])
+
+            with rst.indent():
+                for formal in package.formals:
+                    self.render_item(formal)
+
+        if shard_files is not None:
+            rst.add_lines(['.. toctree::'])
+            with rst.indent():
+                rst.add_lines([':maxdepth: 1', ''] + shard_files)
+        else:
+            for item in package.items:
+                self.render_item(item)
+
+        if not top_level:
+            rst.indentation -= 4
+
+    def render_shard(
+        self, package: Package, items: List[Union[Package, Entity]]
+    ) -> None:
+        """
+        Render the declarations ``items`` of the library level ``package`` as
+        a document of their own. The package is made the current one without
+        being documented again, so that the entities keep the same targets.
+        """
+        rst = self.rst
+        title = shard_title(items)
+        rst.add_lines([
+            '', title, UNDERLINES[0] * len(title),
+            '', f".. ada:current_package:: {package.name}", ''
+        ])
+        for item in items:
+            self.render_item(item)
+
+    def render_entity(self, entity: Entity) -> None:
+        """
+        Render an entity, without the entities associated to it.
+        """
+        rst = self.rst
+        if entity.kind == "incomplete_type":
+            return
+
+        if entity.kind is not None:
+            rst.add_lines([f".. ada:{entity.kind}:: {entity.signature}"])
+            with rst.indent():
+                rst.add_lines([f":package: {entity.package}"])
+
+            if entity.kind in KINDS_WITH_FIELD_BLOCK or entity.fields:
+                with rst.indent():
+                    rst.add_lines([''])
+                    if entity.code is not None:
+                        rst.add_string(".. code-block:: ada")
+                        with rst.indent():
+                            rst.add_lines([''] + entity.code)
+                        rst.add_lines([''])
+                    self.render_fields(entity)
+
+        with rst.indent():
+            rst.add_lines([''] + entity.doc + [''])
+
+    def render_fields(self, entity: Entity) -> None:
+        """
+        Render the fields of an entity.
+        """
+        for f in entity.fields:
+            if f.argument is None:
+                self.rst.add_string(f":{f.name}: " + "\n".join(f.content))
+            else:
+                self.rst.add_string(f":{f.name} {f.argument}:")
+                with self.rst.indent():
+                    self.rst.add_lines(f.content)
+
+
+def render_to_file(
+    package: Package, filename: str, rst_file: str
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Write the rst for the library level ``package`` to ``filename``, as the
+    content of the rst file ``rst_file`` (without extension), and return the
+    entities it documents.
+    """
+    with open(filename, "w") as f:
+        RstRenderer(RstEmitter(f)).render_package(package)
+    return collect_symbols(package, rst_file)
+
+
+def render_shards_to_files(
+    package: Package, out_file: str, shard_size: int
+) -> Tuple[List[str], Dict[str, Tuple[str, str]]]:
+    """
+    Write the rst for the library level ``package`` as with
+    :func:`render_to_file`, to ``<out_file>.rst.new``, splitting its
+    declarations in the shards that :func:`shard_items` returns for
+    ``shard_size``. Each shard is written to ``<out_file>-<n>.rst.new``, and
+    listed in a toctree of the first file.
+
+    Return the rst files, without extension, and the entities they document.
+    """
+    rst_file = P.basename(out_file)
+    shards = shard_items(package, shard_size)
+    if not shards:
+        return (
+            [out_file],
+            render_to_file(package, f"{out_file}.rst.new", rst_file)
+        )
+
+    shard_files = [f"{rst_file}-{i}" for i in range(1, len(shards) + 1)]
+    with open(f"{out_file}.rst.new", "w") as f:
+        RstRenderer(RstEmitter(f)).render_package(package, shard_files)
+    symbols = collect_symbols(
+        Package(package.kind, package.name, formals=package.formals), rst_file
+    )
+
+    rst_files = [out_file]
+    for shard_file, items in zip(shard_files, shards):
+        rst_files.append(P.join(P.dirname(out_file), shard_file))
+        with open(f"{rst_files[-1]}.rst.new", "w") as f:
+            RstRenderer(RstEmitter(f)).render_shard(package, items)
+        for item in items:
+            symbols.update(collect_symbols(item, shard_file))
+    return rst_files, symbols
+
+
+def find_shards(out_dir: str) -> Dict[str, Set[str]]:
+    """
+    Return the rst files of shards in ``out_dir``, by rst file of the package
+    they belong to, all without extension.
+    """
+    result: Dict[str, Set[str]] = defaultdict(set)
+    for filename in os.listdir(out_dir):
+        m = SHARD_RE.match(filename)
+        if m:
+            result[m.group(1)].add(filename[:-4])
+    return result
+
+
+def remove_stale_shards(
+    out_file: str, rst_files: List[str], shards: Set[str]
+) -> None:
+    """
+    Remove the rst files of the given ``shards`` of ``out_file`` that are not
+    in ``rst_files`` anymore, all without extension.
+    """
+    kept = {P.basename(f) for f in rst_files}
+    for shard in shards - kept:
+        try:
+            os.remove(P.join(P.dirname(out_file), f"{shard}.rst"))
+        except OSError:
+            pass
+
+
+def render_stub_to_file(
+    package: Package, filename: str, rst_file: str
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Write to ``filename`` an rst file that only has the title of the library
+    level ``package`` and an ``ada:package_model`` directive loading its model
+    from ``<rst_file>.json``: the Ada domain then builds the documentation
+    directly from the model, without parsing rst. Return the entities it
+    documents.
+    """
+    with open(filename, "w") as f:
+        rst = RstEmitter(f)
+        rst.add_lines([
+            '',
+            package.name,
+            UNDERLINES[0] * len(package.name),
+            '',
+            f".. ada:package_model:: {rst_file}.json",
+        ])
+    return collect_symbols(package, rst_file)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Render rst files from laldoc documentation models."
+    )
+    parser.add_argument(
+        '-O', '--output-dir', type=str, default=".",
+        help='Output directory for the rst files'
+    )
+    parser.add_argument(
+        '--shard-size', type=int, default=0, metavar='N',
+        help='Split packages with more than N declarations in one rst file'
+             ' per nested package and per N other declarations, 0 meaning'
+             ' never'
+    )
+    parser.add_argument(
+        'models', nargs='+', help='JSON files of the models to render'
+    )
+    args = parser.parse_args()
+
+    written_files = 0
+    unchanged_files = 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    shards = find_shards(args.output_dir)
+    for model in args.models:
+        rst_file = P.splitext(P.basename(model))[0]
+        out_file = P.join(args.output_dir, rst_file)
+        rst_files, _ = render_shards_to_files(
+            load_model(model), out_file, args.shard_size
+        )
+        for f in rst_files:
+            if replace_if_changed(f"{f}.rst.new", f"{f}.rst"):
+                written_files += 1
+            else:
+                unchanged_files += 1
+        remove_stale_shards(out_file, rst_files, shards[rst_file])
+
+    print(f"rst files: {written_files} written, {unchanged_files} unchanged")
+
+
+if __name__ == '__main__':
+    main()
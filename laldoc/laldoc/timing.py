@@ -0,0 +1,175 @@
+"""
+Measurement of where ``laldoc.generate_rst`` spends its time, for its
+``--profile`` option.
+
+The processing of each unit is split in phases, such as the classification of
+the declarations of packages or the extraction of each kind of entity. The
+time of a phase excludes the time of the phases nested in it, so that the
+times of the phases of a unit add up to the time spent on it.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import heapq
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+SLOWEST_COUNT = 20
+"""
+Number of units and of entities listed as the slowest ones.
+"""
+
+
+class Phase:
+    """
+    Phase being timed. Its name can be changed until it ends, for instance
+    once the kind of the entity being extracted is known.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.elapsed = 0.0
+        self.nested = 0.0
+
+
+class UnitProfile:
+    """
+    Time spent in each phase of the processing of a unit, and slowest
+    entities of the unit. Nothing is measured unless ``enabled``.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.phases: Dict[str, float] = Counter()
+        self.counts: Dict[str, int] = Counter()
+        self.entities: List[Tuple[float, str, str]] = []
+        self._stack: List[Phase] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        """
+        Context manager timing the code in the with block as the phase
+        ``name``.
+        """
+        phase = Phase(name)
+        if not self.enabled:
+            yield phase
+            return
+
+        self._stack.append(phase)
+        start = perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.elapsed = perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].nested += phase.elapsed
+            self.phases[phase.name] += phase.elapsed - phase.nested
+            self.counts[phase.name] += 1
+
+    def entity(self, seconds: float, kind: str, name: str) -> None:
+        """
+        Record that the extraction of the entity ``name`` of the given kind
+        took ``seconds``, including nested phases.
+        """
+        if not self.enabled:
+            return
+        item = (seconds, kind, name)
+        if len(self.entities) < SLOWEST_COUNT:
+            heapq.heappush(self.entities, item)
+        else:
+            heapq.heappushpop(self.entities, item)
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+
+class ProfileSummary:
+    """
+    Times of the phases of all processed units.
+    """
+
+    def __init__(self, load: float) -> None:
+        self.load = load
+        self.phases: Dict[str, float] = Counter()
+        self.counts: Dict[str, int] = Counter()
+        self.units: Dict[str, Dict[str, float]] = {}
+        self.entities: List[Tuple[float, str, str, str]] = []
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        """
+        Add the time of a phase that is not specific to a unit.
+        """
+        self.phases[name] += seconds
+        self.counts[name] += 1
+
+    def add(self, filename: str, profile: UnitProfile) -> None:
+        """
+        Add the profile of the unit in ``filename``.
+        """
+        self.phases.update(profile.phases)
+        self.counts.update(profile.counts)
+        self.units[filename] = dict(profile.phases, total=profile.total)
+        for seconds, kind, name in profile.entities:
+            item = (seconds, kind, name, filename)
+            if len(self.entities) < SLOWEST_COUNT:
+                heapq.heappush(self.entities, item)
+            else:
+                heapq.heappushpop(self.entities, item)
+
+    def slowest_units(self) -> List[Tuple[str, float]]:
+        return heapq.nlargest(
+            SLOWEST_COUNT,
+            ((filename, phases["total"])
+             for filename, phases in self.units.items()),
+            key=lambda item: item[1]
+        )
+
+    def to_json(self, wall: float) -> Dict[str, Any]:
+        """
+        Return the summary as JSON data, ``wall`` being the total elapsed
+        time of the program. The total time of phases is larger when units
+        are processed in parallel.
+        """
+        return {
+            "wall": wall,
+            "load": self.load,
+            "total": self.load + sum(self.phases.values()),
+            "phases": {
+                name: {"seconds": seconds, "count": self.counts[name]}
+                for name, seconds in sorted(self.phases.items())
+            },
+            "units": self.units,
+            "slowest_entities": [
+                {"seconds": seconds, "kind": kind, "name": name, "unit": unit}
+                for seconds, kind, name, unit in sorted(
+                    self.entities, reverse=True
+                )
+            ],
+        }
+
+    def report(self, wall: float) -> List[str]:
+        """
+        Return the lines of a human readable report, ``wall`` being the total
+        elapsed time of the program.
+        """
+        total = self.load + sum(self.phases.values())
+        lines = [f"elapsed time: {wall:.3f}s", "phase times:"]
+        for name, seconds in sorted(
+            [("load", self.load)] + list(self.phases.items()),
+            key=lambda item: -item[1]
+        ):
+            lines.append(
+                f"    {seconds:9.3f}s {100 * seconds / (total or 1):5.1f}%"
+                f"  {name} ({self.counts.get(name, 1)})"
+            )
+        lines.append("slowest units:")
+        for filename, seconds in self.slowest_units():
+            lines.append(f"    {seconds:9.3f}s  {filename}")
+        lines.append("slowest entities:")
+        for seconds, kind, name, unit in sorted(self.entities, reverse=True):
+            lines.append(f"    {seconds:9.3f}s  {kind} {name} ({unit})")
+        return lines
@@ -10,11 +10,16 @@ Some parts of the code copied from erlangdomain by SHIBUKAWA Yoshiki.
 
 from __future__ import annotations
 
-import logging
+from collections import Counter
+import hashlib
+import heapq
+import json
+import os
+import posixpath
 import re
 from typing import (
     Iterable, List, Protocol, Sequence, Union, cast, Any, Dict, NamedTuple,
-    Iterator, Tuple
+    Iterator, Set, Tuple
 )
 
 from docutils import nodes
@@ -22,18 +27,27 @@ from docutils.nodes import Element
 from docutils.parsers.rst import directives
 from docutils.parsers.rst import Directive
 from docutils.parsers.rst.states import Inliner
+from docutils.statemachine import StringList
 
 from sphinx import addnodes
 from sphinx.addnodes import desc_signature
 from sphinx.application import Sphinx
 from sphinx.builders import Builder
+from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.builders.singlehtml import SingleFileHTMLBuilder
 from sphinx.directives import ObjectDescription
+from sphinx.directives.code import CodeBlock
 from sphinx.domains import Domain, Index, IndexEntry, ObjType
 from sphinx.environment import BuildEnvironment
-from sphinx.locale import _, __
+from sphinx.locale import _, __, get_translator
 from sphinx.roles import XRefRole
+from sphinx.transforms.post_transforms import SphinxPostTransform
 from sphinx.util.docfields import Field, TypedField
-from sphinx.util.nodes import make_refnode, make_id
+from sphinx.util import logging
+from sphinx.util.docutils import SphinxDirective
+from sphinx.util.nodes import make_refnode, make_id, nested_parse_with_titles
+from sphinx.util.osutil import canon_path, ensuredir, relative_uri
+from sphinx.writers.html5 import HTML5Translator
 
 try:
     import libadalang as lal
@@ -71,6 +85,111 @@ ObjectEntry = NamedTuple(
     "ObjectEntry", [("docname", str), ("node_id", str), ("objtype", str)]
 )
 
+AliasEntry = NamedTuple(
+    "AliasEntry", [("docname", str), ("target", str), ("package", str)]
+)
+
+
+class TrieNode:
+    """
+    Node of a :class:`DottedNameTrie`, for one component of a dotted name.
+    """
+
+    __slots__ = ("children", "terminal")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, TrieNode] = {}
+        # Whether the name that ends with this component is in the trie
+        self.terminal = False
+
+
+class DottedNameTrie:
+    """
+    Set of dotted Ada names, organized as a tree of name components.
+
+    This allows to go through the names nested in a given package, for
+    instance the child packages of ``Pkg``, without going through every name
+    in the set. It is maintained incrementally as objects are documented, and
+    is part of the domain data.
+    """
+
+    def __init__(self) -> None:
+        self.root = TrieNode()
+
+    def _find(self, name: str) -> Union[TrieNode, None]:
+        node: Union[TrieNode, None] = self.root
+        for component in name.split(".") if name else []:
+            assert node is not None
+            node = node.children.get(component)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, name: str) -> bool:
+        node = self._find(name)
+        return node is not None and node.terminal
+
+    def insert(self, name: str) -> None:
+        node = self.root
+        for component in name.split("."):
+            node = node.children.setdefault(component, TrieNode())
+        node.terminal = True
+
+    def remove(self, name: str) -> None:
+        path = [self.root]
+        components = name.split(".")
+        for component in components:
+            child = path[-1].children.get(component)
+            if child is None:
+                return
+            path.append(child)
+        path[-1].terminal = False
+
+        # Prune the nodes that do not lead to any name anymore
+        for depth in range(len(components), 0, -1):
+            if path[depth].terminal or path[depth].children:
+                break
+            del path[depth - 1].children[components[depth - 1]]
+
+    def children(self, name: str) -> List[str]:
+        """
+        Return the names in the set that are directly nested in ``name``,
+        sorted case insensitively.
+        """
+        node = self._find(name)
+        if node is None:
+            return []
+        return [
+            f"{name}.{component}" if name else component
+            for component, child in sorted(
+                node.children.items(), key=lambda c: c[0].lower()
+            )
+            if child.terminal
+        ]
+
+    def walk(self, name: str = "") -> Iterator[str]:
+        """
+        Yield the names in the set that are nested in ``name`` (all of them
+        by default), each package before the names nested in it and siblings
+        sorted case insensitively.
+        """
+        node = self._find(name)
+        if node is None:
+            return
+
+        stack = [(name, node)]
+        while stack:
+            prefix, node = stack.pop()
+            if node.terminal and prefix:
+                yield prefix
+            stack.extend(
+                (f"{prefix}.{component}" if prefix else component, child)
+                for component, child in sorted(
+                    node.children.items(), key=lambda c: c[0].lower(),
+                    reverse=True
+                )
+            )
+
 
 class AdaObject(ObjectDescription):
     """
@@ -186,14 +305,30 @@ class AdaObject(ObjectDescription):
         if len(subp_spec_unit.diagnostics) > 0:
             raise self.error("Errors parsing the subp spec")
 
-        is_func = subp_spec.f_subp_returns is not None
-
-        subp_name, returntype = (
+        self.add_subp_sig_nodes(
+            signode,
             subp_spec.f_subp_name.text,
-            subp_spec.f_subp_returns.text if is_func else ""
+            [
+                ([name.text for name in p.f_ids], p.f_type_expr.text)
+                for p in subp_spec.f_subp_params.f_params
+            ] if subp_spec.f_subp_params else [],
+            subp_spec.f_subp_returns.text if subp_spec.f_subp_returns else ""
         )
+        return subp_spec.f_subp_name.text
 
-        kind = "function " if is_func else "procedure "
+    def add_subp_sig_nodes(
+        self,
+        signode: desc_signature,
+        subp_name: str,
+        params: List[Tuple[List[str], str]],
+        returntype: str,
+    ) -> None:
+        """
+        Add the nodes for a subprogram profile to ``signode``, given its
+        parameters as (names, type) tuples and its return type, if it is a
+        function.
+        """
+        kind = "function " if returntype else "procedure "
         signode += addnodes.desc_annotation(kind, kind)
         signode += addnodes.desc_name(signode, subp_name)
 
@@ -203,26 +338,21 @@ class AdaObject(ObjectDescription):
         param_list.child_text_separator = "; "
         signode += param_list
 
-        if subp_spec.f_subp_params:
-            for p in subp_spec.f_subp_params.f_params:
-                param = addnodes.desc_parameter()
-                param_list += param
-                for i, name in enumerate(p.f_ids):
-                    param += addnodes.desc_sig_name("", name.text)
-                    if i + 1 < len(p.f_ids):
-                        param += addnodes.desc_sig_punctuation("", ", ")
-                param += addnodes.desc_sig_punctuation("", " : ")
-
-                refnode = self.make_refnode(
-                    p.f_type_expr.text, addnodes.desc_sig_name
-                )
-                param += refnode
+        for names, typ in params:
+            param = addnodes.desc_parameter()
+            param_list += param
+            for i, name in enumerate(names):
+                param += addnodes.desc_sig_name("", name)
+                if i + 1 < len(names):
+                    param += addnodes.desc_sig_punctuation("", ", ")
+            param += addnodes.desc_sig_punctuation("", " : ")
+
+            refnode = self.make_refnode(typ, addnodes.desc_sig_name)
+            param += refnode
 
         if returntype:
             signode += self.make_refnode(returntype, addnodes.desc_returns)
 
-        return subp_name
-
     def handle_type_sig(self, sig: str, signode: desc_signature) -> str:
         m = ada_type_sig_re.match(sig)
         if m is None:
@@ -337,6 +467,166 @@ class AdaObject(ObjectDescription):
                 ("single", indextext, node_id, "", None)
             )
 
+    def transform_content(self, contentnode: addnodes.desc_content) -> None:
+        self.note_renaming(contentnode)
+        self.make_component_tables(contentnode)
+
+    def note_renaming(self, contentnode: addnodes.desc_content) -> None:
+        """
+        Register the target of the ``:renames:`` field, if any, as an alias
+        for this object, so that references can go through the renaming.
+        """
+        renamed = ""
+        for field_list in contentnode.children:
+            if not isinstance(field_list, nodes.field_list):
+                continue
+            for field in cast(List[nodes.field], field_list.children):
+                if field[0].astext().strip() == "renames":
+                    renamed = field[1].astext().strip()
+
+        if not renamed:
+            return
+
+        domain = cast(AdaDomain, self.env.get_domain("ada"))
+        for signode in cast(Element, contentnode.parent).children:
+            # Signatures without a full name have not been registered in the
+            # domain (for instance because of :noindex:).
+            if isinstance(signode, desc_signature) and "fullname" in signode:
+                domain.note_alias(
+                    signode["fullname"], renamed, signode["package"]
+                )
+
+    def make_component_tables(
+        self, contentnode: addnodes.desc_content
+    ) -> None:
+        """
+        Render the ``:component:`` and ``:discriminant:`` fields as tables
+        when there are many of them, which is much lighter than the generic
+        handling of typed fields for records with thousands of components.
+        """
+        threshold = self.env.config.ada_component_table_threshold
+        if not threshold:
+            return
+
+        # Collect the component fields of all field lists in one go
+        rows: Dict[str, List[Tuple[str, str, bool, nodes.field_body]]] = {
+            "discriminant": [], "component": []
+        }
+        field_lists = []
+        for field_list in contentnode.children:
+            if not isinstance(field_list, nodes.field_list):
+                continue
+            others = []
+            for field in cast(List[nodes.field], field_list.children):
+                # Split the field name like Sphinx does for typed fields
+                field_name = cast(nodes.field_name, field[0])
+                parts = field_name.astext().split(None, 1)
+                kind = component_field_kinds.get(parts[0]) if parts else None
+                if kind is None or len(parts) != 2:
+                    others.append(field)
+                    continue
+                arg = parts[1].rsplit(None, 1)
+                typ, name = arg if len(arg) == 2 else ("", arg[0])
+
+                # Anonymous types are formatted as literals by laldoc
+                anonymous = any(
+                    isinstance(n, nodes.literal) for n in field_name.children
+                )
+                rows[kind].append(
+                    (name, typ, anonymous, cast(nodes.field_body, field[1]))
+                )
+            field_lists.append((field_list, others))
+
+        if sum(len(r) for r in rows.values()) < threshold:
+            return
+
+        tables = nodes.field_list()
+        for kind, label in (("discriminant", _("Discriminants")),
+                            ("component", _("Components"))):
+            if rows[kind]:
+                tables += nodes.field(
+                    "",
+                    nodes.field_name(label, label),
+                    nodes.field_body("", self.make_component_table(rows[kind]))
+                )
+
+        contentnode.insert(contentnode.index(field_lists[0][0]), tables)
+        for field_list, others in field_lists:
+            if others:
+                field_list.clear()
+                field_list.extend(others)
+            else:
+                contentnode.remove(field_list)
+
+    def make_component_table(
+        self, rows: List[Tuple[str, str, bool, nodes.field_body]]
+    ) -> nodes.table:
+        """
+        Create a table with one row per component, given as (name, type,
+        whether the type is anonymous, description) tuples.
+        """
+        table = nodes.table(classes=["ada-components"])
+        tgroup = nodes.tgroup(cols=3)
+        table += tgroup
+        for width in (20, 25, 55):
+            tgroup += nodes.colspec(colwidth=width)
+        header = nodes.row()
+        for title in (_("Name"), _("Type"), _("Description")):
+            header += nodes.entry("", nodes.paragraph(title, title))
+        tgroup += nodes.thead("", header)
+        tbody = nodes.tbody()
+        tgroup += tbody
+
+        # Consecutive components with the same type and description share a
+        # row, and thus a single reference to their type. This groups the
+        # components of a declaration (as in ``A, B : T``), which laldoc
+        # documents separately with the same description, but also any
+        # consecutive components that happen to have the same type and
+        # description, such as undocumented components of the same type. The
+        # description is only compared when the types match, as it is
+        # comparatively costly.
+        last_typ: Union[str, None] = None
+        last_body = nodes.field_body()
+        names = nodes.paragraph()
+        for name, typ, anonymous, body in rows:
+            if typ == last_typ and body.astext() == last_body.astext():
+                names += nodes.Text(", ")
+                names += addnodes.literal_strong(name, name)
+                continue
+            last_typ, last_body = typ, body
+
+            names = nodes.paragraph(
+                "", "", addnodes.literal_strong(name, name)
+            )
+            type_par = nodes.paragraph()
+            if anonymous:
+                type_par += nodes.literal(typ, typ)
+            elif typ:
+                refnode = self.make_refnode(typ, nodes.literal)
+                refnode.source, refnode.line = self.get_source_info()
+                cast(Element, refnode[0])["classes"] += [
+                    "xref", "ada", "ada-type"
+                ]
+                type_par += refnode
+            tbody += nodes.row(
+                "", nodes.entry("", names), nodes.entry("", type_par),
+                nodes.entry("", *body.children)
+            )
+
+        return table
+
+
+component_field_kinds = {
+    "component": "component",
+    "comp": "component",
+    "discriminant": "discriminant",
+    "discr": "discriminant",
+}
+"""
+Names of the typed fields of :class:`AdaObject` that describe record
+components, mapped to the kind of component.
+"""
+
 
 class AdaSetPackage(Directive):
     """
@@ -359,8 +649,9 @@ class AdaSetPackage(Directive):
         modname = self.arguments[0].strip()
         noindex = "noindex" in self.options
         env.temp_data["ada:package"] = modname
-        env.domaindata["ada"]["packages"][modname] = (
-            env.docname,
+        domain = cast(AdaDomain, env.get_domain("ada"))
+        domain.note_package(
+            modname,
             self.options.get("synopsis", ""),
             self.options.get("platform", ""),
             "deprecated" in self.options,
@@ -392,12 +683,434 @@ class AdaSetPackage(Directive):
 
         # Register the module in the Ada domain index, so that we can reference
         # it.
-        domain = cast(AdaDomain, env.get_domain("ada"))
         domain.note_object(modname, "module", node_id, location=targetnode)
 
         return ret
 
 
+class AdaCurrentPackage(Directive):
+    """
+    Directive to set the current library level package, like
+    ``set_package``, without documenting it. laldoc uses it in the documents
+    describing parts of a package split in several documents.
+    """
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = False
+
+    def run(self) -> Sequence[nodes.Node]:
+        env = self.state.document.settings.env
+        env.temp_data["ada:package"] = self.arguments[0].strip()
+        return []
+
+
+LALDOC_MODEL_VERSION = 1
+"""
+Version of the laldoc documentation models that :class:`AdaPackageModel`
+reads.
+"""
+
+
+class AdaModelObject(AdaObject):
+    """
+    Description of an Ada object built from its laldoc documentation model
+    rather than from rst: the signature of subprograms is not parsed, and the
+    content is created by ``package_model``.
+    """
+
+    def __init__(
+        self, model: Dict[str, Any], package_model: AdaPackageModel,
+        *args: Any
+    ) -> None:
+        super().__init__(*args)
+        self.model = model
+        self.package_model = package_model
+
+    def handle_subp_sig(self, sig: str, signode: desc_signature) -> str:
+        self.add_subp_sig_nodes(
+            signode,
+            self.model["name"],
+            [(p["names"], p["type"]) for p in self.model["parameters"]],
+            self.model["returns"] or "",
+        )
+        return self.model["name"]
+
+    def transform_content(self, contentnode: addnodes.desc_content) -> None:
+        if self.model["class"] == "package":
+            contentnode += self.package_model.package_content(self.model)
+        else:
+            contentnode += self.package_model.entity_content(self.model)
+        super().transform_content(contentnode)
+
+
+class AdaPackageModel(SphinxDirective):
+    """
+    Directive documenting a library level package from the documentation
+    model that laldoc saves as JSON, given as argument relative to the
+    document. It creates the same nodes as the rst that laldoc generates for
+    the package, following the title of the package, but builds them directly
+    from the model: only documentation comments are parsed as rst.
+    """
+
+    has_content = False
+    required_arguments = 1
+
+    def run(self) -> List[nodes.Node]:
+        rel_filename, filename = self.env.relfn2path(self.arguments[0])
+        self.env.note_dependency(rel_filename)
+        self.source = filename
+        try:
+            with open(filename) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            raise self.error(f"Cannot load {rel_filename}: {exc}")
+        if data.get("version") != LALDOC_MODEL_VERSION:
+            raise self.error(
+                f"Unsupported model version in {rel_filename}:"
+                f" {data.get('version')}"
+            )
+
+        package = data["package"]
+        return list(AdaSetPackage(
+            "ada:set_package", [package["name"]], {}, StringList(),
+            self.lineno, self.content_offset, "", self.state,
+            self.state_machine
+        ).run()) + self.package_content(package)
+
+    def package_content(self, package: Dict[str, Any]) -> List[nodes.Node]:
+        """
+        Return the nodes for the documentation, generic formals and
+        declarations of ``package``.
+        """
+        result = self.parse(package["doc"])
+        sink = self.content_sink(result)
+        if package["formals"] is not None:
+            formals: List[nodes.Node] = []
+            for formal in package["formals"]:
+                formals += self.item_nodes(formal)
+            sink += [nodes.field_list(
+                "", nodes.field(
+                    "", nodes.field_name("Formals", "Formals"),
+                    nodes.field_body("", *formals)
+                )
+            )]
+        for item in package["items"]:
+            sink += self.item_nodes(item)
+        return result
+
+    def entity_content(self, entity: Dict[str, Any]) -> List[nodes.Node]:
+        """
+        Return the nodes for the code, fields and documentation of
+        ``entity``, as well as for the entities associated to it.
+        """
+        result: List[nodes.Node] = []
+        if entity["code"] is not None:
+            result += CodeBlock(
+                "code-block", ["ada"], {},
+                StringList([line.rstrip() for line in entity["code"]]),
+                self.lineno, self.content_offset, "", self.state,
+                self.state_machine
+            ).run()
+
+        if entity["fields"]:
+            field_list = nodes.field_list()
+            for field in entity["fields"]:
+                if field["argument"] is None:
+                    name = field["name"]
+                else:
+                    name = f"{field['name']} {field['argument']}"
+                name_nodes, _messages = self.state.inline_text(
+                    name, self.lineno
+                )
+                field_list += nodes.field(
+                    "", nodes.field_name(name, "", *name_nodes),
+                    nodes.field_body("", *self.parse(field["content"]))
+                )
+            result.append(field_list)
+
+        result += self.parse(entity["doc"])
+        sink = self.content_sink(result)
+        for associated in entity["associated"]:
+            sink += self.item_nodes(associated)
+        return result
+
+    def item_nodes(self, item: Dict[str, Any]) -> List[nodes.Node]:
+        """
+        Return the nodes documenting a declaration of a package.
+        """
+        if item["class"] == "package":
+            objtype, signature, options = item["kind"], item["name"], {}
+        elif item["kind"] in (None, "incomplete_type"):
+            # laldoc only outputs the documentation of entities it does not
+            # handle, and the entities associated to incomplete types.
+            content = self.entity_content(dict(
+                item, code=None, fields=[],
+                doc=item["doc"] if item["kind"] is None else []
+            ))
+            return [nodes.block_quote("", *content)] if content else []
+        else:
+            objtype, signature = item["kind"], item["signature"]
+            options = {"package": item["package"]}
+
+        return AdaModelObject(
+            item, self, f"ada:{objtype}", [signature], options, StringList(),
+            self.lineno, self.content_offset, "", self.state,
+            self.state_machine
+        ).run()
+
+    @staticmethod
+    def content_sink(
+        content: List[nodes.Node]
+    ) -> Union[List[nodes.Node], nodes.Element]:
+        """
+        Return where the nodes following ``content`` belong: as in rst, they
+        are part of the last section that documentation comments start, if
+        any.
+        """
+        sink: Union[List[nodes.Node], nodes.Element] = content
+        while len(sink) and isinstance(sink[-1], nodes.section):
+            sink = sink[-1]
+        return sink
+
+    def parse(self, lines: List[str]) -> List[nodes.Node]:
+        """
+        Return the nodes for the rst text in ``lines``.
+        """
+        node = nodes.Element()
+        nested_parse_with_titles(
+            self.state, StringList(lines, self.source), node
+        )
+        return node.children
+
+
+class package_contents(nodes.General, nodes.Element):
+    """
+    Placeholder for the list of the objects documented in a package, which is
+    only known once every document has been read.
+    """
+
+
+class AdaPackageContents(Directive):
+    """
+    Directive to list the objects documented in a given package, with links
+    to their documentation.
+    """
+
+    has_content = False
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = False
+
+    def run(self) -> Sequence[nodes.Node]:
+        node = package_contents()
+        node["package"] = self.arguments[0].strip()
+        return [node]
+
+
+class PackageContentsTransform(SphinxPostTransform):
+    """
+    Replace ``package_contents`` placeholders with the list of the objects
+    nested in their package.
+    """
+
+    default_priority = 20
+
+    def run(self, **kwargs: Any) -> None:
+        domain = cast(AdaDomain, self.env.get_domain("ada"))
+        for node in list(self.document.findall(package_contents)):
+            items = nodes.bullet_list()
+            for fullname in domain.object_tree.children(node["package"]):
+                obj = domain.objects[fullname]
+                simple_name = fullname.split(".")[-1]
+                refnode = make_refnode(
+                    self.app.builder, self.env.docname, obj.docname, fullname,
+                    nodes.literal(simple_name, simple_name), fullname
+                )
+                items += nodes.list_item("", nodes.paragraph("", "", refnode))
+            node.replace_self(items if items.children else [])
+
+
+class ComponentTableXrefs(SphinxPostTransform):
+    """
+    Resolve the type references of component tables once per distinct type,
+    before the generic references resolver, which would otherwise look up
+    the same type for every component. References that cannot be resolved
+    are left to the generic resolver, so that they go through intersphinx
+    and are reported like other references.
+    """
+
+    default_priority = 5
+
+    def run(self, **kwargs: Any) -> None:
+        domain = cast(AdaDomain, self.env.get_domain("ada"))
+        for table in self.document.findall(nodes.table):
+            if "ada-components" not in table["classes"]:
+                continue
+
+            resolved: Dict[Tuple[str, str], Element] = {}
+            unresolved: Set[Tuple[str, str]] = set()
+            tbody = cast(Element, cast(Element, table[0])[-1])
+            for row in cast(List[Element], tbody.children):
+                # The type of the component is in the second column
+                para = cast(Element, cast(Element, row[1])[0])
+                if not para.children or not isinstance(
+                    para[0], addnodes.pending_xref
+                ):
+                    continue
+                node = cast(addnodes.pending_xref, para[0])
+                key = (node["reftarget"], node.get("ada:package", ""))
+                if key in unresolved:
+                    continue
+                if key in resolved:
+                    refnode = resolved[key]
+                    para[0] = refnode.copy()
+                    para[0] += refnode[0].deepcopy()
+                    continue
+
+                found = domain.resolve_xref(
+                    self.env, self.env.docname, self.app.builder, "type",
+                    node["reftarget"], node, cast(Element, node[0])
+                )
+                if found is None:
+                    unresolved.add(key)
+                else:
+                    resolved[key] = para[0] = found
+
+
+class lazy_members(nodes.General, nodes.Element):
+    """
+    Members documented in the body of an Ada type, which the HTML builder
+    writes to a separate file that is only loaded when the reader expands
+    them.
+    """
+
+
+class LazyMembersTransform(SphinxPostTransform):
+    """
+    Move the members documented in the body of Ada types, that is nested
+    declarations and components, to ``lazy_members`` nodes, when the
+    ``ada_html_lazy_members`` option is set.
+    """
+
+    default_priority = 200
+    formats = ("html",)
+
+    def run(self, **kwargs: Any) -> None:
+        if not self.config.ada_html_lazy_members:
+            return
+
+        groups = 0
+        for desc in list(self.document.findall(addnodes.desc)):
+            if desc["domain"] != "ada" or desc["objtype"] != "type":
+                continue
+            content = cast(Element, desc[-1])
+            members = [
+                child for child in content.children
+                if isinstance(child, (addnodes.desc, nodes.field_list))
+            ]
+            if not members:
+                continue
+
+            node = lazy_members()
+            node["group"] = str(groups)
+            groups += 1
+            content.insert(content.index(members[0]), node)
+            for member in members:
+                content.remove(member)
+                node += member
+
+
+def visit_lazy_members(
+    self: HTML5Translator, node: lazy_members
+) -> None:
+    """
+    Render the members to a string, for the members file of the page, and
+    only emit a collapsed placeholder in the page itself.
+    """
+    translator = cast(
+        HTML5Translator,
+        self.builder.create_translator(self.document, self.builder)
+    )
+    for child in node.children:
+        child.walkabout(translator)
+    node["html"] = "".join(translator.body)
+
+    docname = self.builder.current_docname
+    src = relative_uri(
+        self.builder.get_target_uri(docname), lazy_members_file(docname)
+    )
+    self.body.append(
+        self.starttag(
+            node, "details", CLASS="ada-members",
+            **{"data-ada-group": node["group"], "data-ada-src": src}
+        )
+        + f"<summary>{self.encode(_('Members'))}</summary></details>\n"
+    )
+    raise nodes.SkipNode
+
+
+def lazy_members_file(docname: str) -> str:
+    """
+    Return the path of the members file for ``docname``, relative to the
+    output directory.
+    """
+    return f"_ada_members/{docname}.js"
+
+
+def write_lazy_members(
+    app: Sphinx, pagename: str, templatename: str, context: Dict[str, Any],
+    doctree: Union[nodes.document, None]
+) -> None:
+    """
+    Write the members file of a page: a script that passes the HTML for each
+    group of members, and the group in which each member id is defined, to the
+    ``AdaLazyMembers`` object of the page.
+    """
+    if doctree is None:
+        return
+
+    groups: Dict[str, str] = {}
+    parents: Dict[str, str] = {}
+    ids: Dict[str, str] = {}
+    for node in doctree.findall(lazy_members):
+        groups[node["group"]] = node["html"]
+        parent = node.parent
+        while parent is not None and not isinstance(parent, lazy_members):
+            parent = parent.parent
+        if parent is not None:
+            parents[node["group"]] = parent["group"]
+
+        # Nested groups come later, and override the ids of their parents
+        for element in node.findall(Element):
+            for node_id in element["ids"]:
+                ids[node_id] = node["group"]
+
+    if not groups:
+        return
+
+    path = os.path.join(app.outdir, lazy_members_file(pagename))
+    ensuredir(os.path.dirname(path))
+    with open(path, "w", encoding="utf-8") as f:
+        data = {"groups": groups, "parents": parents, "ids": ids}
+        f.write(
+            f"AdaLazyMembers.loaded({json.dumps(data, sort_keys=True)});\n"
+        )
+
+
+def add_lazy_members_script(app: Sphinx) -> None:
+    """
+    Add the script loading the members of Ada types to HTML pages, when the
+    ``ada_html_lazy_members`` option is set.
+    """
+    if app.builder.format == "html" and app.config.ada_html_lazy_members:
+        app.config.html_static_path.append(
+            os.path.join(os.path.dirname(__file__), "static")
+        )
+        app.add_js_file("adadomain.js")
+
+
 def rmlink(name: str, rawtext: str, text: str,
            lineno: int, inliner: Inliner, options: Dict[str, Any] = {},
            content: List[str] = []) -> Tuple[List[nodes.Node],
@@ -432,6 +1145,19 @@ class AdaXRefRole(XRefRole):
         return title, target
 
 
+PackageIndexPage = NamedTuple(
+    "PackageIndexPage",
+    [
+        ("title", str),
+        ("content", List[Tuple[str, List[IndexEntry]]]),
+        ("collapse", bool),
+    ],
+)
+"""
+Page of the package index, when it is split in several pages.
+"""
+
+
 class AdaPackageIndex(Index):
     """
     Index subclass to provide the Ada package index.
@@ -444,22 +1170,102 @@ class AdaPackageIndex(Index):
     def generate(
         self, docnames: Union[Iterable[str], None] = None
     ) -> Tuple[List[Tuple[str, List[IndexEntry]]], bool]:
+        domain = cast(AdaDomain, self.domain)
+        pages = self.generate_pages(docnames)
+        if pages is None:
+            return self.generate_content(domain.package_tree.walk(), docnames)
+
+        # The index is split: only list its pages
+        content: Dict[str, List[IndexEntry]] = {}
+        for pagename, page in pages.items():
+            num_packages = sum(
+                1 for _letter, entries in page.content for entry in entries
+                if entry.docname
+            )
+            content.setdefault(page.title[0].lower(), []).append(
+                IndexEntry(
+                    page.title, 0, pagename, "", "", "",
+                    get_translator().ngettext(
+                        "%d package", "%d packages", num_packages
+                    ) % num_packages
+                )
+            )
+        return sorted(content.items()), False
+
+    def generate_pages(
+        self, docnames: Union[Iterable[str], None] = None
+    ) -> Union[Dict[str, PackageIndexPage], None]:
+        """
+        Return the pages of the index, by page name, when the
+        ``ada_modindex_pages`` option asks for the index to be split and the
+        builder writes them, and None otherwise.
+        """
+        # Only the pages of HTML builders that write one file per page and
+        # extension pages can be linked to.
+        builder = self.domain.env.app.builder
+        if not (
+            isinstance(builder, StandaloneHTMLBuilder)
+            and builder.format == "html"
+            and not builder.embedded
+            and not isinstance(builder, SingleFileHTMLBuilder)
+        ):
+            return None
+
+        domain = cast(AdaDomain, self.domain)
+        split = self.domain.env.config.ada_modindex_pages
+        pages: Dict[str, PackageIndexPage] = {}
+        if split == "letter":
+            content, collapse = self.generate_content(
+                domain.package_tree.walk(), docnames
+            )
+            for letter, entries in content:
+                pages[f"{self.page_prefix}-{letter}"] = PackageIndexPage(
+                    letter.upper(), [(letter, entries)], collapse
+                )
+        elif split == "package":
+            toplevels = dict.fromkeys(
+                name.split(".")[0] for name in domain.package_tree.walk()
+            )
+            for toplevel in toplevels:
+                content, collapse = self.generate_content(
+                    domain.package_tree.walk(toplevel), docnames
+                )
+                if content:
+                    pages[f"{self.page_prefix}-{toplevel.lower()}"] = (
+                        PackageIndexPage(toplevel, content, collapse)
+                    )
+        else:
+            return None
+        return pages
+
+    @property
+    def page_prefix(self) -> str:
+        return f"{self.domain.name}-{self.name}"
+
+    def generate_content(
+        self, modnames: Iterable[str],
+        docnames: Union[Iterable[str], None] = None
+    ) -> Tuple[List[Tuple[str, List[IndexEntry]]], bool]:
+        """
+        Return the content of the index for the given packages, which are
+        expected in the order of :meth:`DottedNameTrie.walk`.
+        """
 
         content: Dict[str, List[IndexEntry]] = {}
         # list of prefixes to ignore
         ignores = self.domain.env.config["modindex_common_prefix"]
         ignores = sorted(ignores, key=len, reverse=True)
-        # list of all modules, sorted by module name
-        # (Python 3 has no iteritems, so use items).
-        modules = sorted(
-            self.domain.data["packages"].items(), key=lambda x: x[0].lower()
-        )
-        # sort out collapsable modules
+        domain = cast(AdaDomain, self.domain)
+        # sort out collapsable modules: child packages are listed right after
+        # their parent.
         prev_modname = ""
+        num_modules = 0
         num_toplevels = 0
-        for modname, (docname, synopsis, platforms, deprecated) in modules:
+        for modname in modnames:
+            docname, synopsis, platforms, deprecated = domain.packages[modname]
             if docnames and docname not in docnames:
                 continue
+            num_modules += 1
 
             for ignore in ignores:
                 if modname.startswith(ignore):
@@ -475,11 +1281,15 @@ class AdaPackageIndex(Index):
 
             entries = content.setdefault(modname[0].lower(), [])
 
-            package = modname.split(":")[0]
+            package = modname.split(".")[0]
             if package != modname:
-                # it's a submodule
-                if not prev_modname.startswith(package):
-                    # submodule without parent in list, add dummy entry
+                # it's a child package
+                if prev_modname == package:
+                    # first child package: make the parent a group head
+                    if entries:
+                        entries[-1] = entries[-1]._replace(subtype=1)
+                elif prev_modname.split(".")[0] != package:
+                    # child package without parent in list, add dummy entry
                     entries.append(
                         IndexEntry(stripped + package, 1, "", "", "", "", "")
                     )
@@ -505,7 +1315,7 @@ class AdaPackageIndex(Index):
         # apply heuristics when to collapse modindex at page load:
         # only collapse if number of toplevel modules is larger than
         # number of submodules.
-        collapse = len(modules) - num_toplevels < num_toplevels
+        collapse = num_modules - num_toplevels < num_toplevels
 
         # sort by first letter
         # (Python 3 has no iteritems, so use items).
@@ -514,6 +1324,97 @@ class AdaPackageIndex(Index):
         return list_content, collapse
 
 
+class NameSuggestions:
+    """
+    Trigram index over the simple names of documented Ada objects, used to
+    suggest close matches for references that cannot be resolved.
+
+    Names are compared case-insensitively. A lookup only considers the rarest
+    trigrams of the queried simple name, then ranks the few simple names
+    sharing the most of them, and finally the full names that end with them,
+    so that its cost does not depend on the number of objects.
+    """
+
+    max_trigrams = 8
+    """
+    Number of trigrams of the queried name that are looked up: the rarest
+    ones are the most discriminating.
+    """
+
+    max_candidates = 16
+    """
+    Number of simple names sharing the most trigrams with the query that are
+    ranked.
+    """
+
+    def __init__(self, full_names: Iterable[str]) -> None:
+        self.keys: List[str] = []
+        self.names: List[List[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        key_ids: Dict[str, int] = {}
+        for full_name in full_names:
+            key = full_name.rsplit(".", 1)[-1].lower()
+            key_id = key_ids.get(key)
+            if key_id is None:
+                key_id = key_ids[key] = len(self.keys)
+                self.keys.append(key)
+                self.names.append([])
+                for trigram in self.trigrams(key):
+                    self.postings.setdefault(trigram, []).append(key_id)
+            self.names[key_id].append(full_name)
+
+    @staticmethod
+    def trigrams(key: str) -> Set[str]:
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def suggest(self, name: str, count: int = 3) -> List[str]:
+        """
+        Return up to ``count`` full names of objects close to ``name``, best
+        matches first.
+        """
+        query = name.lower()
+        query_key = query.rsplit(".", 1)[-1]
+        query_trigrams = self.trigrams(query_key)
+        postings = sorted(
+            (self.postings[t] for t in query_trigrams if t in self.postings),
+            key=len
+        )
+
+        scores: Counter = Counter()
+        for posting in postings[:self.max_trigrams]:
+            scores.update(posting)
+
+        # Rank simple names by their Dice coefficient with the query
+        def key_score(key_id: int) -> float:
+            return (2 * scores[key_id] / (
+                len(query_trigrams) + len(self.trigrams(self.keys[key_id]))
+            ))
+
+        candidates = sorted(
+            (key_id for key_id, _ in scores.most_common(self.max_candidates)),
+            key=lambda key_id: (-key_score(key_id), self.keys[key_id])
+        )
+
+        # Among the full names sharing a simple name, prefer the ones sharing
+        # the most package names with the query.
+        query_parts = set(query.split("."))
+
+        def name_score(full_name: str) -> Tuple[int, str]:
+            parts = set(full_name.lower().split("."))
+            return (-len(parts & query_parts), full_name)
+
+        result: List[str] = []
+        for key_id in candidates:
+            result.extend(heapq.nsmallest(
+                count - len(result), self.names[key_id], key=name_score
+            ))
+            if len(result) == count:
+                break
+        return result
+
+
 class AdaDomain(Domain):
     """Ada language domain."""
 
@@ -531,6 +1432,9 @@ class AdaDomain(Domain):
         "procedure": AdaObject,
         "type": AdaObject,
         "set_package": AdaSetPackage,
+        "current_package": AdaCurrentPackage,
+        "package_model": AdaPackageModel,
+        "package_contents": AdaPackageContents,
         "package": AdaObject,
         "generic_package": AdaObject,
         "object": AdaObject,
@@ -553,16 +1457,169 @@ class AdaDomain(Domain):
         "procedures": {},  # fullname -> arity -> (targetname, docname)
         "packages": {},
         # packagename -> docname, synopsis, platform, deprecated
+        "aliases": {},  # fullname -> AliasEntry
+        "folded_objects": {},  # case folded fullname -> fullname
+        "object_tree": DottedNameTrie(),  # fullnames of all objects
+        "package_tree": DottedNameTrie(),  # names of all packages
     }
+    data_version = 3
 
     indices = [
         AdaPackageIndex,
     ]
 
+    def __init__(self, env: BuildEnvironment) -> None:
+        super().__init__(env)
+        # Renamings collapsed to the name of the object they finally designate.
+        # This is derived from ``aliases`` at the end of the read phase, so it
+        # is not part of the pickled domain data.
+        self._resolved_aliases: Union[Dict[str, str], None] = None
+        # Index used to suggest names for unresolved references. It is only
+        # built once all documents have been read, when the first unresolved
+        # reference is found.
+        self._suggestions: Union[NameSuggestions, None] = None
+        # Objects listed in the symbol manifests written by laldoc, by full
+        # name and by case folded full name. They are only used for references
+        # to documents that are not part of the build.
+        self.provisional_objects: Dict[str, ObjectEntry] = {}
+        self._folded_provisional_objects: Dict[str, str] = {}
+        # Fingerprints of the package index pages written by this build. They
+        # are only saved once the build is finished, so that the pages are
+        # written again if it is interrupted.
+        self.package_index_fingerprints: Union[Dict[str, str], None] = None
+
     def clear_doc(self, docname: str) -> None:
         for fullname, obj in list(self.objects.items()):
             if obj.docname == docname:
                 del self.objects[fullname]
+                folded = fullname.lower()
+                if self.folded_objects.get(folded) == fullname:
+                    del self.folded_objects[folded]
+                self.object_tree.remove(fullname)
+        for modname, entry in list(self.packages.items()):
+            if entry[0] == docname:
+                del self.packages[modname]
+                self.package_tree.remove(modname)
+        for fullname, alias in list(self.aliases.items()):
+            if alias.docname == docname:
+                del self.aliases[fullname]
+        self._resolved_aliases = None
+        self._suggestions = None
+
+    def check_consistency(self) -> None:
+        # Every document has been read at this point: collapse renaming chains
+        # once, so that resolving a reference through a renaming is a single
+        # lookup.
+        self._resolved_aliases = self._collapse_aliases()
+
+    @property
+    def suggestions(self) -> NameSuggestions:
+        if self._suggestions is None:
+            self._suggestions = NameSuggestions(self.objects)
+        return self._suggestions
+
+    def merge_domaindata(self, docnames: List[str], otherdata: Dict) -> None:
+        docs = set(docnames)
+        for fullname, obj in otherdata["objects"].items():
+            if obj.docname in docs:
+                self.objects[fullname] = obj
+                self.folded_objects.setdefault(fullname.lower(), fullname)
+                self.object_tree.insert(fullname)
+        for modname, package in otherdata["packages"].items():
+            if package[0] in docs:
+                self.packages[modname] = package
+                self.package_tree.insert(modname)
+        for fullname, alias in otherdata["aliases"].items():
+            if alias.docname in docs:
+                self.aliases[fullname] = alias
+        self._resolved_aliases = None
+        self._suggestions = None
+
+    def _find_renamed(self, alias: AliasEntry) -> str:
+        """
+        Return the full name of the entity designated by ``alias``, or the
+        empty string if it is not documented. The renamed name is looked up
+        as is, then relative to the package of the renaming declaration.
+        """
+        for name in (alias.target, f"{alias.package}.{alias.target}"):
+            if name in self.objects or name in self.aliases:
+                return name
+            fullname = self.folded_objects.get(name.lower())
+            if fullname:
+                return fullname
+        return ""
+
+    def _collapse_aliases(self) -> Dict[str, str]:
+        """
+        Map every renaming declaration (case folded) to the full name of the
+        object it finally designates, following chains of renamings.
+        Renamings that are part of a cycle, or that designate an undocumented
+        entity, are left out.
+        """
+        resolved: Dict[str, str] = {}
+        unresolved = set()
+
+        for name in self.aliases:
+            chain: List[str] = []
+            current = name
+            target = ""
+            while True:
+                if current.lower() in resolved:
+                    target = resolved[current.lower()]
+                    break
+                if current in unresolved:
+                    break
+                if current in chain:
+                    logger.warning(
+                        __("cycle in renamings: %s"),
+                        " -> ".join(chain[chain.index(current):] + [current]),
+                        location=(self.aliases[current].docname, None),
+                        type="ref",
+                        subtype="ada",
+                    )
+                    break
+                chain.append(current)
+
+                renamed = self._find_renamed(self.aliases[current])
+                if not renamed:
+                    break
+                if renamed not in self.aliases:
+                    target = renamed
+                    break
+                current = renamed
+
+            if target:
+                resolved.update((n.lower(), target) for n in chain)
+            else:
+                unresolved.update(chain)
+
+        return resolved
+
+    @property
+    def resolved_aliases(self) -> Dict[str, str]:
+        # The consistency check is skipped when no document was read in this
+        # build, so compute the table on demand in that case.
+        if self._resolved_aliases is None:
+            self._resolved_aliases = self._collapse_aliases()
+        return self._resolved_aliases
+
+    def _find_through_aliases(self, name: str) -> str:
+        """
+        Return the full name of the object designated by ``name`` when some
+        prefix of it is a renaming (for instance ``P.T`` when ``P`` renames
+        ``Q``), or the empty string.
+        """
+        parts = name.split(".")
+        for i in range(len(parts) - 1, 0, -1):
+            target = self.resolved_aliases.get(".".join(parts[:i]).lower())
+            if target:
+                candidate = ".".join([target] + parts[i:])
+                if candidate in self.objects:
+                    return candidate
+                fullname = self.folded_objects.get(candidate.lower())
+                if fullname:
+                    return fullname
+        return ""
 
     def _find_obj(
         self, env: BuildEnvironment, modname: str, name: str, objtype: str
@@ -573,22 +1630,83 @@ class AdaDomain(Domain):
 
         TODO: Handling references to overloaded functions.
         """
+        fqn = f"{modname}.{name}"
+
         # First try: try to find an object by that name (this is assuming that
         # the user used a fully qualified name)
         obj = self.objects.get(name, None)
 
         # Second try: try prefixing the object with the module name.
         if obj is None:
-            fqn = f"{modname}.{name}"
             obj = self.objects.get(fqn)
             if obj is not None:
                 name = fqn
 
+        # Third try: Ada names are case insensitive, so look for a spelling of
+        # the name, then of the prefixed name, that differs only in casing.
+        if obj is None:
+            for candidate in (name, fqn):
+                fullname = self.folded_objects.get(candidate.lower())
+                if fullname:
+                    name, obj = fullname, self.objects[fullname]
+                    break
+
+        # Fourth try: go through renamings, with the name as is and then
+        # prefixed with the module name.
+        if obj is None:
+            for candidate in (name, fqn):
+                target = self._find_through_aliases(candidate)
+                if target:
+                    name, obj = target, self.objects[target]
+                    break
+
+        # Fifth try: look for the name, as is and then prefixed with the
+        # module name, in the symbol manifests.
+        if obj is None:
+            for candidate in (name, fqn):
+                fullname, obj = self._find_provisional(candidate)
+                if obj:
+                    name = fullname
+                    break
+
         if obj:
             return name, obj.docname
 
         return ("", "")
 
+    def _find_provisional(
+        self, name: str
+    ) -> Tuple[str, Union[ObjectEntry, None]]:
+        """
+        Look ``name`` up in the symbol manifests, ignoring the objects of the
+        documents that are part of the build, for which the objects that were
+        actually read are authoritative.
+        """
+        fullname = (
+            name if name in self.provisional_objects
+            else self._folded_provisional_objects.get(name.lower(), "")
+        )
+        obj = self.provisional_objects.get(fullname)
+        if obj is None or obj.docname in self.env.all_docs:
+            return "", None
+        return fullname, obj
+
+    def load_symbol_manifest(self, path: str, docprefix: str) -> None:
+        """
+        Load the symbols of a manifest written by laldoc as provisional
+        objects. The documents of the manifest are relative to ``docprefix``.
+        """
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        for fullname, (filename, objtype) in manifest["symbols"].items():
+            docname = posixpath.join(docprefix, filename)
+            self.provisional_objects[fullname] = ObjectEntry(
+                docname, fullname, objtype
+            )
+            self._folded_provisional_objects.setdefault(
+                fullname.lower(), fullname
+            )
+
     def resolve_xref(
         self, env: BuildEnvironment, fromdocname: str,
         builder: Builder,
@@ -601,10 +1719,8 @@ class AdaDomain(Domain):
         # Resolve classwide type references to their base type
         real_target = target
 
-        # We only handle the capitalized 'Class, because it is necessarily
-        # formatted with a capital when the result is generated by Libadalang's
-        # doc generator.
-        if target.endswith("'Class"):
+        # Attribute names are case insensitive, like other Ada names
+        if target.lower().endswith("'class"):
             real_target = target[:-6]
 
         modname = node.get("ada:package")
@@ -613,13 +1729,19 @@ class AdaDomain(Domain):
             return None
         else:
             # If we correctly resolved the object and are able to make an
-            # hyperlink, then use its relative name as a display name.
+            # hyperlink, then use its relative name as a display name. Use the
+            # casing of the declaration if the reference only differs in
+            # casing.
+            display_name = target.split(".")[-1]
+            simple_name = name.split(".")[-1]
+            if real_target.split(".")[-1].lower() == simple_name.lower():
+                display_name = simple_name + target[len(real_target):]
 
             # TODO: For some reason in old versions of Sphinx the contnode is
             # sometimes a `Text` node, which doesn't make any sense as far as I
             # understand. Ignore those cases:
             if not isinstance(contnode, nodes.Text):
-                contnode[0] = nodes.Text(target.split(".")[-1])
+                contnode[0] = nodes.Text(display_name)
             return make_refnode(
                 builder, fromdocname, obj, name, contnode, name
             )
@@ -647,9 +1769,249 @@ class AdaDomain(Domain):
                 ),
                 name,
                 other.docname,
+                location=location,
             )
         self.objects[name] = ObjectEntry(self.env.docname, node_id, objtype)
+        self.folded_objects.setdefault(name.lower(), name)
+        self.object_tree.insert(name)
+        self._suggestions = None
+
+    @property
+    def packages(self) -> Dict[str, Tuple[str, str, str, bool]]:
+        # packagename -> docname, synopsis, platform, deprecated
+        return self.data.setdefault("packages", {})
+
+    @property
+    def object_tree(self) -> DottedNameTrie:
+        return self.data.setdefault("object_tree", DottedNameTrie())
+
+    @property
+    def package_tree(self) -> DottedNameTrie:
+        return self.data.setdefault("package_tree", DottedNameTrie())
 
+    def note_package(
+        self, name: str, synopsis: str, platform: str, deprecated: bool
+    ) -> None:
+        """
+        Note a library level ada package for the package index.
+        """
+        self.packages[name] = (
+            self.env.docname, synopsis, platform, deprecated
+        )
+        self.package_tree.insert(name)
+
+    @property
+    def folded_objects(self) -> Dict[str, str]:
+        # case folded fullname -> fullname
+        return self.data.setdefault("folded_objects", {})
+
+    @property
+    def aliases(self) -> Dict[str, AliasEntry]:
+        return self.data.setdefault("aliases", {})  # fullname -> AliasEntry
+
+    def note_alias(self, name: str, target: str, package: str) -> None:
+        """
+        Note that the ada object ``name`` renames ``target``, which is looked
+        up relative to ``package`` if it is not a full name.
+        """
+        self.aliases[name] = AliasEntry(self.env.docname, target, package)
+        self._resolved_aliases = None
 
-def setup(app: Sphinx) -> None:
+
+def warn_missing_reference(
+    app: Sphinx, domain: Union[Domain, None], node: addnodes.pending_xref
+) -> Union[bool, None]:
+    """
+    Warn about an unresolved Ada reference, suggesting the names of the
+    closest documented objects. The warning replaces the one Sphinx would
+    emit, with the same type, so that it is counted, turned into an error by
+    ``-W`` and silenced by ``suppress_warnings``.
+    """
+    if not isinstance(domain, AdaDomain):
+        return None
+
+    target = node["reftarget"]
+    suggestions = domain.suggestions.suggest(target)
+    if not suggestions:
+        return None
+
+    logger.warning(
+        __("ada:%s reference target not found: %s (did you mean %s?)"),
+        node["reftype"],
+        target,
+        ", ".join(suggestions),
+        location=node,
+        type="ref",
+        subtype=node["reftype"],
+    )
+    return True
+
+
+def warm_up_libadalang(app: Sphinx) -> None:
+    """
+    Parse a subprogram specification before Sphinx forks the processes that
+    read documents in parallel, so that they share the libadalang state that
+    this initializes instead of each building its own copy. This is
+    experimental, and only done when ``ada_warm_up_libadalang`` is set.
+    """
+    if not (
+        USE_LAL and app.parallel > 1 and app.config.ada_warm_up_libadalang
+    ):
+        return
+
+    lal_context.get_from_buffer(
+        "<input>", "procedure P (X : Integer)",
+        rule=lal.GrammarRule.subp_spec_rule
+    )
+
+
+def load_symbol_manifests(app: Sphinx) -> None:
+    """
+    Load the symbol manifests given by the ``ada_symbol_manifests`` option, so
+    that references to the symbols they list resolve even when their
+    documents are not part of the build.
+    """
+    domain = cast(AdaDomain, app.env.get_domain("ada"))
+    for path in app.config.ada_symbol_manifests:
+        path = os.path.join(app.confdir, path)
+
+        # The documents of the manifest are next to it
+        docprefix = os.path.relpath(os.path.dirname(path), app.srcdir)
+        if docprefix.startswith(os.pardir):
+            logger.warning(
+                __("Ada symbol manifest %s is not in the source directory"),
+                path,
+                type="ada",
+                subtype="manifest",
+            )
+            continue
+        docprefix = "" if docprefix == os.curdir else canon_path(docprefix)
+
+        try:
+            domain.load_symbol_manifest(path, docprefix)
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(
+                __("cannot load Ada symbol manifest %s: %s"),
+                path,
+                exc,
+                type="ada",
+                subtype="manifest",
+            )
+
+
+PACKAGE_INDEX_FINGERPRINTS = ".ada-modindex"
+"""
+File of the output directory where the fingerprints of the package index
+pages that were written are saved.
+"""
+
+
+def collect_package_index_pages(
+    app: Sphinx
+) -> List[Tuple[str, Dict[str, Any], str]]:
+    """
+    Return the pages of the package index to write, when the
+    ``ada_modindex_pages`` option asks for the index to be split. Pages whose
+    content did not change since they were last written are skipped.
+    """
+    builder = cast(StandaloneHTMLBuilder, app.builder)
+    domain = cast(AdaDomain, app.env.get_domain("ada"))
+    index = AdaPackageIndex(domain)
+    indices = app.config.html_domain_indices
+    if not indices or (
+        isinstance(indices, list) and index.page_prefix not in indices
+    ):
+        return []
+
+    pages = index.generate_pages()
+    if not pages:
+        return []
+
+    # Fingerprints of the pages that were written, which also depend on the
+    # configuration so that everything is written again when it changes.
+    try:
+        with open(
+            os.path.join(app.outdir, PACKAGE_INDEX_FINGERPRINTS),
+            encoding="utf-8"
+        ) as f:
+            old_fingerprints = json.load(f)
+    except (OSError, ValueError):
+        old_fingerprints = {}
+    build_info = getattr(builder, "build_info", None)
+    config_hash = (
+        f"{build_info.config_hash}:{build_info.tags_hash}"
+        if build_info else ""
+    )
+
+    result = []
+    fingerprints = {}
+    for pagename, page in pages.items():
+        fingerprints[pagename] = hashlib.sha1(
+            f"{config_hash}:{page!r}".encode("utf-8")
+        ).hexdigest()
+        if fingerprints[pagename] == old_fingerprints.get(
+            pagename
+        ) and os.path.exists(builder.get_outfilename(pagename)):
+            continue
+
+        result.append((
+            pagename,
+            {
+                "indextitle": f"{index.localname}: {page.title}",
+                "content": page.content,
+                "collapse_index": page.collapse,
+            },
+            "domainindex.html",
+        ))
+
+    logger.info(
+        __("%d of %d Ada package index pages changed"), len(result), len(pages)
+    )
+    domain.package_index_fingerprints = fingerprints
+    return result
+
+
+def save_package_index_fingerprints(
+    app: Sphinx, exception: Union[Exception, None]
+) -> None:
+    """
+    Save the fingerprints of the package index pages once the build wrote
+    them.
+    """
+    if exception is not None:
+        return
+    domain = cast(AdaDomain, app.env.get_domain("ada"))
+    if domain.package_index_fingerprints is None:
+        return
+
+    ensuredir(app.outdir)
+    with open(
+        os.path.join(app.outdir, PACKAGE_INDEX_FINGERPRINTS), "w",
+        encoding="utf-8"
+    ) as f:
+        json.dump(domain.package_index_fingerprints, f, sort_keys=True)
+
+
+def setup(app: Sphinx) -> Dict[str, Any]:
     app.add_domain(AdaDomain)
+    app.add_config_value("ada_component_table_threshold", 0, "env")
+    app.add_config_value("ada_html_lazy_members", False, "html")
+    app.add_config_value("ada_modindex_pages", None, "html", [str])
+    app.add_config_value("ada_symbol_manifests", [], "env")
+    app.add_config_value("ada_warm_up_libadalang", False, "")
+    app.add_node(lazy_members, html=(visit_lazy_members, None))
+    app.add_post_transform(PackageContentsTransform)
+    app.add_post_transform(ComponentTableXrefs)
+    app.add_post_transform(LazyMembersTransform)
+    app.connect("builder-inited", add_lazy_members_script)
+    app.connect("builder-inited", load_symbol_manifests)
+    app.connect("builder-inited", warm_up_libadalang)
+    app.connect("html-page-context", write_lazy_members)
+    app.connect("html-collect-pages", collect_package_index_pages)
+    app.connect("build-finished", save_package_index_fingerprints)
+    app.connect("warn-missing-reference", warn_missing_reference)
+
+    return {
+        "parallel_read_safe": True,
+        "parallel_write_safe": True,
+    }
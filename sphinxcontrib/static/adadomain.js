@@ -0,0 +1,93 @@
+/*
+ * Lazy loading of the members of Ada types, see the ada_html_lazy_members
+ * configuration value of sphinxcontrib.adadomain.
+ *
+ * The members of each type are replaced by a collapsed <details> element. The
+ * HTML for all of them is in a per-page script file that is only loaded when a
+ * reader first expands a type, or follows a link to one of its members.
+ */
+
+"use strict";
+
+const AdaLazyMembers = {
+  data: null,
+  callbacks: [],
+
+  /* Load the members of the page from ``src`` if needed, then call
+     ``callback`` with them. */
+  load(src, callback) {
+    if (this.data) {
+      callback(this.data);
+      return;
+    }
+    this.callbacks.push(callback);
+    if (this.callbacks.length === 1) {
+      const script = document.createElement("script");
+      script.src = src;
+      document.head.appendChild(script);
+    }
+  },
+
+  /* Called by the members file of the page once it is loaded. */
+  loaded(data) {
+    this.data = data;
+    this.callbacks.splice(0).forEach((callback) => callback(data));
+  },
+
+  /* Insert the members of a type in its <details> element. */
+  expand(details, data) {
+    if (details.dataset.adaLoaded) {
+      return;
+    }
+    details.dataset.adaLoaded = "true";
+    details.insertAdjacentHTML(
+      "beforeend", data.groups[details.dataset.adaGroup]
+    );
+  },
+
+  /* Expand the types enclosing the element with the given id, if it is not
+     part of the page yet, and scroll to it. */
+  reveal(id) {
+    const first = document.querySelector("details.ada-members");
+    if (!id || !first || document.getElementById(id)) {
+      return;
+    }
+    this.load(first.dataset.adaSrc, (data) => {
+      const chain = [];
+      for (let group = data.ids[id]; group; group = data.parents[group]) {
+        chain.unshift(group);
+      }
+      for (const group of chain) {
+        const details = document.querySelector(
+          `details.ada-members[data-ada-group="${group}"]`
+        );
+        if (!details) {
+          return;
+        }
+        this.expand(details, data);
+        details.open = true;
+      }
+      const target = document.getElementById(id);
+      if (target) {
+        target.scrollIntoView();
+      }
+    });
+  },
+};
+
+/* "toggle" events do not bubble, so listen to them during capture */
+document.addEventListener("toggle", (event) => {
+  const details = event.target;
+  if (details.open && details.classList.contains("ada-members")) {
+    AdaLazyMembers.load(
+      details.dataset.adaSrc,
+      (data) => AdaLazyMembers.expand(details, data)
+    );
+  }
+}, true);
+
+const revealLocation = () => AdaLazyMembers.reveal(
+  decodeURIComponent(window.location.hash.substring(1))
+);
+document.addEventListener("DOMContentLoaded", revealLocation);
+window.addEventListener("hashchange", revealLocation);
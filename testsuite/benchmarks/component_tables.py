@@ -0,0 +1,91 @@
+#! /usr/bin/env python3
+
+"""
+Compare the time Sphinx takes to build a document with a record type with
+many components when they are rendered as field lists and as tables (see the
+``ada_component_table_threshold`` configuration value).
+"""
+
+import argparse
+import os.path as P
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = P.abspath(P.join(P.dirname(P.abspath(__file__)), "..", ".."))
+
+CONF_PY = """
+import sys
+sys.path.insert(0, {root!r})
+extensions = ['sphinxcontrib.adadomain']
+"""
+
+
+def write_project(directory: str, components: int, types: int) -> None:
+    """
+    Write a project with a single document, declaring ``types`` types and a
+    record type with ``components`` components of these types, each with a
+    cross reference in its documentation.
+    """
+    lines = ["Pkg", "---", "", ".. ada:set_package:: Pkg", ""]
+    for t in range(types):
+        lines += [f".. ada:type:: type T{t}", "    :package: Pkg", ""]
+    lines += [".. ada:type:: type R", "    :package: Pkg", ""]
+    for c in range(components):
+        t = c % types
+        lines += [
+            f"    :component Pkg.T{t} C{c}:",
+            f"        Component of type :ada:ref:`Pkg.T{t}`",
+        ]
+
+    with open(P.join(directory, "conf.py"), "w") as f:
+        f.write(CONF_PY.format(root=ROOT_DIR))
+    with open(P.join(directory, "index.rst"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def build(directory: str, builder: str, threshold: int) -> float:
+    """
+    Build the project in ``directory`` from scratch and return the time it
+    took.
+    """
+    out_dir = P.join(directory, f"out-{builder}-{threshold}")
+    start = time.perf_counter()
+    subprocess.check_call(
+        [
+            sys.executable, "-m", "sphinx", "-q", "-E", "-b", builder,
+            "-D", f"ada_component_table_threshold={threshold}",
+            directory, out_dir,
+        ]
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--components", type=int, default=5_000)
+    parser.add_argument("--types", type=int, default=50)
+    parser.add_argument("--builder", default="dummy")
+    parser.add_argument(
+        "--runs", type=int, default=3,
+        help="Number of builds, of which the fastest is reported"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_project(directory, args.components, args.types)
+        print(
+            f"{args.components} components of {args.types} types,"
+            f" {args.builder} builder, best of {args.runs}:"
+        )
+        for label, threshold in [("field lists", 0), ("tables", 1)]:
+            best = min(
+                build(directory, args.builder, threshold)
+                for _ in range(args.runs)
+            )
+            print(f"  {label}: {best:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+"""
+Measure the time it takes to build the index used to suggest names for
+unresolved Ada references, and to look up misspelled names in it, on a
+synthetic table of dotted names.
+"""
+
+import argparse
+import os.path as P
+import random
+import sys
+import time
+
+sys.path.insert(0, P.join(P.dirname(P.abspath(__file__)), "..", ".."))
+
+from sphinxcontrib.adadomain import NameSuggestions  # noqa: E402
+
+
+WORDS = [
+    "Buffer", "Cursor", "Element", "File", "Handle", "Index", "Kind", "List",
+    "Map", "Node", "Options", "Parser", "Queue", "Range", "Reader", "Set",
+    "Stream", "Table", "Token", "Tree", "Unit", "Value", "Vector", "Writer",
+]
+
+
+def make_names(count: int, rng: random.Random) -> list:
+    """
+    Return ``count`` distinct dotted names of 2 to 4 components.
+    """
+    names = set()
+    while len(names) < count:
+        names.add(".".join(
+            "_".join(rng.sample(WORDS, rng.randint(1, 3)))
+            for _ in range(rng.randint(2, 4))
+        ))
+    return sorted(names)
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """
+    Return ``name`` with one character of its last component swapped with the
+    next one.
+    """
+    prefix, _, simple = name.rpartition(".")
+    i = rng.randrange(len(simple) - 1)
+    simple = simple[:i] + simple[i + 1] + simple[i] + simple[i + 2:]
+    return f"{prefix}.{simple}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--names", type=int, default=200_000,
+        help="Number of names in the table"
+    )
+    parser.add_argument(
+        "--queries", type=int, default=2_000,
+        help="Number of misspelled names to look up"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_names(args.names, rng)
+    queries = [misspell(rng.choice(names), rng) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    suggestions = NameSuggestions(names)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        suggestions.suggest(query)
+    lookup_time = time.perf_counter() - start
+
+    print(f"names: {len(names)}, queries: {len(queries)}")
+    print(f"index build: {build_time:.2f}s")
+    print(f"lookup: {lookup_time / len(queries) * 1000:.2f}ms on average")
+
+
+if __name__ == "__main__":
+    main()
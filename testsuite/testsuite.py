@@ -8,7 +8,7 @@ import sys
 import subprocess
 
 from e3.testsuite import Testsuite
-from e3.testsuite.driver.diff import DiffTestDriver
+from e3.testsuite.driver.diff import DiffTestDriver, ReplacePath
 from e3.fs import sync_tree
 from e3.sys import interpreter
 
@@ -69,6 +69,13 @@ class GendocDriver(BaseDocDriver):
     def copy_test_directory(self) -> bool:
         return False
 
+    @property
+    def output_refiners(self):
+        # Sphinx warnings contain the path to the test's working directory
+        return super().output_refiners + [
+            ReplacePath(self.test_env["working_dir"], ".")
+        ]
+
     def set_up(self) -> None:
         self.derived_env = dict(os.environ)
         if self.env.options.python_prefix:
@@ -109,15 +116,27 @@ class GendocDriver(BaseDocDriver):
         with open(P.join(self.test_env["working_dir"], "conf.py"), "w") as f:
             f.write(CONF_PY_TEMPLATE)
 
-        rst_files = glob.glob(P.join(self.test_env["working_dir"], "*.rst"))
+        rst_files = sorted(
+            glob.glob(P.join(self.test_env["working_dir"], "*.rst"))
+        )
+
+        # Documents listed in the toctree of the index, all rst files by
+        # default. Other documents are expected to be listed in toctrees of
+        # the test's own documents.
+        toctree = self.test_env.get(
+            "toctree", [P.basename(r) for r in rst_files]
+        )
 
         with open(P.join(self.test_env["working_dir"], "index.rst"), "w") as f:
-            f.write(INDEX_RST_TEMPLATE.format(
-                "    \n".join([P.basename(r) for r in rst_files])
-            ))
+            f.write(INDEX_RST_TEMPLATE.format("\n   ".join(toctree)))
+
+        # Additional sphinx-build arguments, for instance to enable nitpicky
+        # mode or override configuration values.
+        sphinx_args = self.test_env.get("sphinx_args", [])
 
         self.shell(
-            ["sphinx-build", ".", "out"] + rst_files + ["-q", "-b", "xml"],
+            ["sphinx-build", ".", "out"] + rst_files + ["-q", "-b", "xml"]
+            + sphinx_args,
             env=self.derived_env,
         )
 
@@ -127,9 +146,9 @@ class GendocDriver(BaseDocDriver):
                 env=self.derived_env,
             )
 
-        for xmlf in glob.glob(
+        for xmlf in sorted(glob.glob(
             P.join(self.test_env["working_dir"], "out", "*.xml")
-        ):
+        )):
             # Skip index.xml
             if not P.basename(xmlf) == "index.xml":
                 with open(xmlf) as f:
@@ -157,7 +176,7 @@ class LALDocDriver(BaseDocDriver):
         with open(self.working_dir("p.gpr"), "w") as f:
             f.write("project P is end P;")
 
-        # Run laldoc on that project
+        # Run laldoc on that project, with the test's additional arguments
         self.shell(
             [
                 self.python_interpreter(),
@@ -166,6 +185,7 @@ class LALDocDriver(BaseDocDriver):
                 "-P",
                 "p.gpr"
             ]
+            + self.test_env.get("laldoc_args", [])
         )
 
         # Consider all generate RST files for the test baseline